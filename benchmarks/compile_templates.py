@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+"""Benchmark the compile time of templates using many pagination tags.
+
+Usage::
+
+    python benchmarks/compile_templates.py [number of tags] [repeat]
+
+Each run builds a new template engine, as a freshly started worker does,
+and compiles a template with the given number of *paginate* tags (each
+followed by *show_pages* and *show_pageitems*). Cold runs also clear the
+cache of parsed *paginate* tags; warm runs reuse it, like workers compiling
+the same tags in several templates.
+"""
+import os
+import sys
+import timeit
+
+import django
+from django.conf import settings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# "N" is replaced by the index of the tag.
+TAG = (
+    "{% paginate 20 entriesN starting from page -1 "
+    "using 'pageN' as page_entriesN %}"
+    "{% show_pages %}{% show_pageitems %}"
+)
+
+
+def main(tags=50, repeat=20):
+    from django.template import Engine
+    from simple_pagination.templatetags import paginate
+
+    source = '{% load paginate %}' + ''.join(
+        TAG.replace('N', str(index)) for index in range(tags))
+
+    def compile_template():
+        Engine(libraries={
+            'paginate': 'simple_pagination.templatetags.paginate',
+        }).from_string(source)
+
+    def compile_cold():
+        paginate.parse_paginate_arguments.cache_clear()
+        compile_template()
+
+    for name, func in (('cold', compile_cold), ('warm', compile_template)):
+        best = min(timeit.repeat(func, number=1, repeat=repeat))
+        print('{0}: {1} tags compiled in {2:.3f} ms'.format(
+            name, tags, best * 1000))
+
+
+if __name__ == "__main__":
+    settings.configure(
+        INSTALLED_APPS=('simple_pagination',),
+        TEMPLATES=[{
+            'BACKEND': 'django.template.backends.django.DjangoTemplates',
+            'APP_DIRS': True,
+        }],
+    )
+    django.setup()
+    main(*[int(arg) for arg in sys.argv[1:3]])
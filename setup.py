@@ -20,7 +20,13 @@ for dirpath, dirnames, filenames in os.walk(PROJECT_NAME):
 setup(
     name='django-simple-pagination',
     version='1.4',
-    packages=['simple_pagination', 'simple_pagination.migrations', 'simple_pagination.templatetags'],
+    packages=[
+        'simple_pagination',
+        'simple_pagination.management',
+        'simple_pagination.management.commands',
+        'simple_pagination.migrations',
+        'simple_pagination.templatetags',
+    ],
     include_package_data=True,
     description='A simple pagination app for Django.',
     long_description="\n\n".join([open("README.rst").read()]),
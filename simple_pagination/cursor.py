@@ -0,0 +1,172 @@
+"""Compact, signed cursor tokens for keyset pagination.
+
+A cursor is a tuple of ordering values (ints, decimals, strings, dates,
+datetimes, UUIDs, booleans or None), packed in a binary form, signed with
+the project ``SECRET_KEY`` and encoded with URL safe base64 without
+padding.
+"""
+
+from __future__ import unicode_literals
+
+import base64
+import binascii
+import datetime
+import decimal
+import hashlib
+import hmac
+import struct
+import uuid
+
+from django.conf import settings as django_settings
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+
+
+SIGNATURE_SIZE = 8
+SALT = b'simple_pagination.cursor'
+
+_INT = struct.Struct('>q')
+_LENGTH = struct.Struct('>H')
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+# Type tags.
+_NONE, _TRUE, _FALSE, _INTEGER, _STRING, _UUID, _DATETIME, _AWARE = (
+    b'0', b't', b'f', b'i', b's', b'u', b'd', b'z')
+_BIG_INTEGER, _DECIMAL, _DATE = b'I', b'm', b'a'
+
+
+class InvalidCursor(ValueError):
+    """The cursor token is malformed or has been tampered with."""
+
+
+# Signing keys derived from the secret keys.
+_keys = {}
+
+
+def _signature(data):
+    secret = django_settings.SECRET_KEY
+    try:
+        key = _keys[secret]
+    except KeyError:
+        key = _keys[secret] = hashlib.sha256(
+            SALT + force_bytes(secret)).digest()
+    return hmac.new(key, data, hashlib.sha256).digest()[:SIGNATURE_SIZE]
+
+
+def _timestamp(value):
+    delta = value - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+
+def _pack_text(tag, value):
+    data = value.encode('utf-8')
+    return tag + _LENGTH.pack(len(data)) + data
+
+
+def _pack(value):
+    if value is None:
+        return _NONE
+    if value is True:
+        return _TRUE
+    if value is False:
+        return _FALSE
+    if isinstance(value, int):
+        try:
+            return _INTEGER + _INT.pack(value)
+        except struct.error:
+            # The value does not fit in 64 bits.
+            return _pack_text(_BIG_INTEGER, str(value))
+    if isinstance(value, decimal.Decimal):
+        return _pack_text(_DECIMAL, str(value))
+    if isinstance(value, str):
+        return _pack_text(_STRING, value)
+    if isinstance(value, uuid.UUID):
+        return _UUID + value.bytes
+    if isinstance(value, datetime.datetime):
+        if timezone.is_aware(value):
+            value = value.astimezone(datetime.timezone.utc).replace(
+                tzinfo=None)
+            return _AWARE + _INT.pack(_timestamp(value))
+        return _DATETIME + _INT.pack(_timestamp(value))
+    if isinstance(value, datetime.date):
+        return _DATE + _INT.pack(value.toordinal())
+    raise TypeError('Cannot encode %r in a cursor.' % type(value).__name__)
+
+
+def _unpack(data):
+    values, offset, size = [], 0, len(data)
+    while offset < size:
+        tag = data[offset:offset + 1]
+        offset += 1
+        if tag == _NONE:
+            values.append(None)
+        elif tag == _TRUE:
+            values.append(True)
+        elif tag == _FALSE:
+            values.append(False)
+        elif tag == _INTEGER:
+            values.append(_INT.unpack_from(data, offset)[0])
+            offset += _INT.size
+        elif tag == _DATE:
+            values.append(datetime.date.fromordinal(
+                _INT.unpack_from(data, offset)[0]))
+            offset += _INT.size
+        elif tag in (_STRING, _BIG_INTEGER, _DECIMAL):
+            length = _LENGTH.unpack_from(data, offset)[0]
+            offset += _LENGTH.size
+            if offset + length > size:
+                raise InvalidCursor('Truncated cursor.')
+            text = data[offset:offset + length].decode('utf-8')
+            if tag == _BIG_INTEGER:
+                values.append(int(text))
+            elif tag == _DECIMAL:
+                values.append(decimal.Decimal(text))
+            else:
+                values.append(text)
+            offset += length
+        elif tag == _UUID:
+            if offset + 16 > size:
+                raise InvalidCursor('Truncated cursor.')
+            values.append(uuid.UUID(bytes=data[offset:offset + 16]))
+            offset += 16
+        elif tag in (_DATETIME, _AWARE):
+            value = _EPOCH + datetime.timedelta(
+                microseconds=_INT.unpack_from(data, offset)[0])
+            if tag == _AWARE:
+                value = value.replace(tzinfo=datetime.timezone.utc)
+            values.append(value)
+            offset += _INT.size
+        else:
+            raise InvalidCursor('Unknown value type in cursor.')
+    return tuple(values)
+
+
+def encode_cursor(values):
+    """Return the signed token representing the sequence of *values*."""
+    data = b''.join(_pack(value) for value in values)
+    token = base64.urlsafe_b64encode(_signature(data) + data)
+    return token.rstrip(b'=').decode('ascii')
+
+
+def decode_cursor(token):
+    """Return the tuple of values stored in *token*.
+
+    Raise *InvalidCursor* if the token is malformed or its signature does
+    not match.
+    """
+    try:
+        token = force_bytes(token)
+        raw = base64.urlsafe_b64decode(token + b'=' * (-len(token) % 4))
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidCursor('Malformed cursor.')
+    signature, data = raw[:SIGNATURE_SIZE], raw[SIGNATURE_SIZE:]
+    if len(signature) != SIGNATURE_SIZE or not hmac.compare_digest(
+            signature, _signature(data)):
+        raise InvalidCursor('Bad cursor signature.')
+    try:
+        return _unpack(data)
+    except InvalidCursor:
+        raise
+    except (struct.error, UnicodeDecodeError, ValueError, OverflowError,
+            decimal.InvalidOperation):
+        raise InvalidCursor('Malformed cursor.')
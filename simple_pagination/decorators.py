@@ -0,0 +1,91 @@
+"""View decorators for paginated pages."""
+
+from __future__ import unicode_literals
+
+import hashlib
+
+from django.core.paginator import InvalidPage, Paginator
+from django.db.models import Count, Max
+from django.views.decorators.http import condition
+
+from simple_pagination import settings
+from simple_pagination import utils
+
+
+def get_page_validators(
+        queryset, page_number, per_page, querystring_key, **kwargs):
+    """Return an *(etag, last_modified)* tuple for the requested page.
+
+    The validators are computed with a single aggregation over the page
+    slice (the latest *updated_field* value and the number of items), plus
+    the total count, which is required anyway to render the page links.
+    """
+    updated_field = kwargs.get('updated_field', 'updated_at')
+    paginator = Paginator(queryset, per_page)
+    if page_number < 0:
+        page_number = utils.normalize_page_number(
+            page_number, paginator.page_range)
+    try:
+        page = paginator.page(page_number)
+    except InvalidPage:
+        # The same fallback used by the *paginate* template tag.
+        page = paginator.page(1)
+    data = page.object_list.aggregate(
+        last_modified=Max(updated_field), items=Count('pk'))
+    last_modified = data['last_modified']
+    etag = hashlib.md5('{0}:{1}:{2}:{3}:{4}:{5}'.format(
+        querystring_key,
+        page.number,
+        per_page,
+        paginator.count,
+        data['items'],
+        last_modified.isoformat() if last_modified else '',
+    ).encode('utf-8')).hexdigest()
+    return etag, last_modified
+
+
+def condition_on_page(queryset, per_page=None, **kwargs):
+    """Answer ``304 Not Modified`` when the requested page did not change.
+
+    Usage::
+
+        @condition_on_page(lambda request: Entry.objects.all(), per_page=20)
+        def entries(request):
+            ...
+
+    *queryset* is either a queryset or a callable receiving the view
+    arguments and returning one; it must be the queryset paginated in the
+    template. The page number is read from *querystring_key* (by default
+    ``settings.PAGE_LABEL``), the same key used by the *paginate* tag.
+    """
+    querystring_key = kwargs.get('querystring_key', None)
+    default_number = kwargs.get('default_number', 1)
+    updated_field = kwargs.get('updated_field', 'updated_at')
+
+    def validators(request, *args, **kwargs):
+        # Both validators are computed at once and stored on the request.
+        cache = request.__dict__.setdefault(
+            '_simple_pagination_validators', {})
+        key = querystring_key or settings.PAGE_LABEL
+        if key not in cache:
+            objects = queryset(request, *args, **kwargs) if callable(
+                queryset) else queryset
+            page_number = utils.get_page_number_from_request(
+                request, key, default=default_number)
+            # The validators depend on the normalized number of items per
+            # page, like the page itself.
+            page_size = utils.get_per_page_from_request(
+                request, default=per_page or settings.PER_PAGE)
+            cache[key] = get_page_validators(
+                objects, page_number, page_size, key,
+                updated_field=updated_field)
+        return cache[key]
+
+    def etag_func(request, *args, **kwargs):
+        return validators(request, *args, **kwargs)[0]
+
+    def last_modified_func(request, *args, **kwargs):
+        return validators(request, *args, **kwargs)[1]
+
+    return condition(
+        etag_func=etag_func, last_modified_func=last_modified_func)
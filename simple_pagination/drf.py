@@ -0,0 +1,193 @@
+"""Django REST Framework pagination classes.
+
+Use them in your *settings.py*, e.g.::
+
+    REST_FRAMEWORK = {
+        'DEFAULT_PAGINATION_CLASS':
+            'simple_pagination.drf.PageNumberPagination',
+    }
+
+The page number, the number of items per page and the cursors are read
+from the same querystring keys used by the template tags.
+"""
+
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+
+from django.template import loader
+from rest_framework.pagination import BasePagination, PageLink
+from rest_framework.response import Response
+
+from simple_pagination import paginators
+from simple_pagination import settings
+from simple_pagination import utils
+
+
+def _get_url(request, number, querystring_key, params=None):
+    querystring = utils.get_querystring_for_page(
+        request, number, querystring_key, params=params)
+    return request.build_absolute_uri(request.path + querystring)
+
+
+class PageNumberPagination(BasePagination):
+    """Paginate by page number, like the *paginate* template tag.
+
+    If *count* is False, the objects are not counted: one more object than
+    the page size is retrieved to know if there is a next page, and the
+    response does not include the total.
+    """
+
+    page_size = None
+    querystring_key = None
+    paginator_class = None
+    count = True
+    template = 'rest_framework/pagination/numbers.html'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # The pagination utilities work with the Django request.
+        self.request = getattr(request, '_request', request)
+        querystring_key = self.querystring_key or settings.PAGE_LABEL
+        page_size = self.page_size or settings.PER_PAGE
+        if self.count:
+            data = utils.paginate_objects(
+                self.request, queryset, page_size,
+                paginator_class=self.paginator_class,
+                querystring_key=querystring_key)
+            page = data['page']
+            self.number = page.number
+            self.num_pages = page.paginator.num_pages
+            self.total = page.paginator.count
+            self.has_next = page.has_next()
+            self.params = data['querystring_params']
+            objects = list(page.object_list)
+        else:
+            page_size = utils.get_per_page_from_request(
+                self.request, default=page_size)
+            self.number = max(utils.get_page_number_from_request(
+                self.request, querystring_key), 1)
+            bottom = (self.number - 1) * page_size
+            objects = list(queryset[bottom:bottom + page_size + 1])
+            self.num_pages = self.total = None
+            self.has_next = len(objects) > page_size
+            self.params = None
+            objects = objects[:page_size]
+        self.querystring_key = querystring_key
+        self.display_page_controls = self.number > 1 or self.has_next
+        return objects
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return _get_url(
+            self.request, self.number + 1, self.querystring_key, self.params)
+
+    def get_previous_link(self):
+        if self.number <= 1:
+            return None
+        return _get_url(
+            self.request, self.number - 1, self.querystring_key, self.params)
+
+    def get_paginated_response(self, data):
+        content = OrderedDict()
+        if self.total is not None:
+            content['count'] = self.total
+        content['next'] = self.get_next_link()
+        content['previous'] = self.get_previous_link()
+        content['results'] = data
+        return Response(content)
+
+    def get_paginated_response_schema(self, schema):
+        properties = OrderedDict()
+        if self.count:
+            properties['count'] = {'type': 'integer'}
+        properties['next'] = {'type': 'string', 'nullable': True}
+        properties['previous'] = {'type': 'string', 'nullable': True}
+        properties['results'] = schema
+        return {'type': 'object', 'properties': properties}
+
+    def get_html_context(self):
+        page_links = []
+        if self.num_pages is not None:
+            # The same Digg-style page numbers of the *show_pages* tag.
+            for item in utils.get_page_numbers(self.number, self.num_pages):
+                if isinstance(item, int):
+                    page_links.append(PageLink(
+                        _get_url(
+                            self.request, item, self.querystring_key,
+                            self.params),
+                        item, item == self.number, False))
+        return {
+            'previous_url': self.get_previous_link(),
+            'next_url': self.get_next_link(),
+            'page_links': page_links,
+        }
+
+    def to_html(self):
+        return loader.get_template(self.template).render(
+            self.get_html_context())
+
+
+class KeysetPagination(BasePagination):
+    """Paginate by signed cursors, like the *keyset_paginate* template tag.
+
+    The objects are never counted, and every page (including the previous
+    and the last ones) costs a single query.
+    """
+
+    page_size = None
+    querystring_key = None
+    template = 'rest_framework/pagination/previous_and_next.html'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = getattr(request, '_request', request)
+        self.querystring_key = self.querystring_key or settings.PAGE_LABEL
+        data = utils.paginate_objects(
+            self.request, queryset, self.page_size or settings.PER_PAGE,
+            paginator_class=paginators.KeysetPaginator,
+            querystring_key=self.querystring_key)
+        self.page = data['page']
+        self.params = data['querystring_params']
+        self.display_page_controls = self.page.has_other_pages()
+        return list(self.page.object_list)
+
+    def get_next_link(self):
+        if not self.page.has_next():
+            return None
+        return _get_url(
+            self.request, self.page.next_page_number(),
+            self.querystring_key, self.params)
+
+    def get_previous_link(self):
+        if not self.page.has_previous():
+            return None
+        return _get_url(
+            self.request, self.page.previous_page_number(),
+            self.querystring_key, self.params)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def get_html_context(self):
+        return {
+            'previous_url': self.get_previous_link(),
+            'next_url': self.get_next_link(),
+        }
+
+    def to_html(self):
+        return loader.get_template(self.template).render(
+            self.get_html_context())
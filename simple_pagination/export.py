@@ -0,0 +1,101 @@
+"""Static export of every page of a paginated queryset."""
+
+from __future__ import unicode_literals
+
+import io
+import os
+import posixpath
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.paginator import Page, Paginator
+from django.template import loader
+from django.test import RequestFactory
+from django.utils.safestring import mark_safe
+
+from simple_pagination import models
+from simple_pagination import settings
+
+
+def _write_file(filename, content):
+    directory = os.path.dirname(filename)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory, exist_ok=True)
+    with io.open(filename, 'w', encoding='utf-8') as output:
+        output.write(content)
+    return filename
+
+
+class _ExportPageList(models.PageList):
+    """Page links pointing to the exported files, relative to each other."""
+
+    def __init__(self, request, page, querystring_key, filename_format):
+        super(_ExportPageList, self).__init__(request, page, querystring_key)
+        self._filename_format = filename_format
+        self._directory = posixpath.dirname(
+            filename_format.format(number=page.number))
+
+    def _endless_page(self, number, label=None):
+        page = super(_ExportPageList, self)._endless_page(number, label=label)
+        filename = self._filename_format.format(number=number)
+        page.url = page.path = urllib.parse.quote(
+            posixpath.relpath(filename, self._directory or '.'))
+        return page
+
+
+def iter_pages(queryset, per_page=None):
+    """Yield the pages of *queryset* walking it with a single ordered scan.
+
+    Only two queries are performed, whatever the number of pages: the count
+    (required by the page links) and a server-side cursor over the ordered
+    queryset, instead of one OFFSET query per page.
+    """
+    per_page = per_page or settings.PER_PAGE
+    paginator = Paginator(queryset, per_page)
+    number, items = 1, []
+    for item in queryset.iterator(chunk_size=max(per_page, 100)):
+        items.append(item)
+        if len(items) == per_page:
+            yield Page(items, number, paginator)
+            number, items = number + 1, []
+    if items or number == 1:
+        yield Page(items, number, paginator)
+
+
+def export_pages(queryset, template_name, output_dir, **kwargs):
+    """Render every page of *queryset* to a file inside *output_dir*.
+
+    The *template_name* template is rendered for each page with
+    *object_list*, *page* and *show_pages* (the pagination links, as
+    rendered by ``{% show_pages %}``) in the context. File names are built
+    from *filename_format*, e.g. ``page-{number}.html``, and the page links
+    point to those files, relative to the page linking them. The request
+    used to render the pages has the given *path*.
+
+    Rendering happens in the current process, while files are written in
+    parallel by a pool of *max_workers* threads.
+    Return the list of written file names.
+    """
+    per_page = kwargs.get('per_page', None)
+    querystring_key = kwargs.get('querystring_key', None) or settings.PAGE_LABEL
+    path = kwargs.get('path', '/')
+    filename_format = kwargs.get('filename_format', 'page-{number}.html')
+    max_workers = kwargs.get('max_workers', None)
+    factory = RequestFactory()
+    template = loader.get_template(template_name)
+    futures = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for page in iter_pages(queryset, per_page=per_page):
+            data = {querystring_key: page.number} if page.number != 1 else {}
+            request = factory.get(path, data)
+            pages = _ExportPageList(
+                request, page, querystring_key, filename_format)
+            content = template.render({
+                'object_list': page.object_list,
+                'page': page,
+                'show_pages': mark_safe(str(pages)),
+            }, request)
+            filename = os.path.join(
+                output_dir, filename_format.format(number=page.number))
+            futures.append(executor.submit(_write_file, filename, content))
+    return [future.result() for future in futures]
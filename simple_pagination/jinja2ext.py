@@ -0,0 +1,118 @@
+"""Jinja2 support for Django Simple Pagination.
+
+Add the extension to the Jinja2 backend options in your *settings.py*::
+
+    TEMPLATES = [
+        {
+            'BACKEND': 'django.template.backends.jinja2.Jinja2',
+            'OPTIONS': {
+                'extensions': [
+                    'simple_pagination.jinja2ext.PaginationExtension',
+                ],
+            },
+            ...
+        },
+    ]
+
+Then, in templates:
+
+.. code-block:: html+jinja
+
+    {% set endless = paginate(entries, 20) %}
+    {% for entry in endless.page.object_list %}
+        {# your code to show the entry #}
+    {% endfor %}
+    {{ show_pages(endless) }}
+    {{ show_pageitems(endless) }}
+"""
+
+from __future__ import unicode_literals
+
+import jinja2
+from jinja2.ext import Extension
+
+from simple_pagination import models
+from simple_pagination import settings
+from simple_pagination import utils
+
+
+# Jinja2 < 3.0 only provides *contextfunction*.
+pass_context = getattr(jinja2, 'pass_context', None) or jinja2.contextfunction
+
+
+# Jinja2 counterparts of the *simple/\*.html* templates.
+MACROS = """
+{%- macro current_link(page) -%}
+<li class="page-item"><a class="page-link active">{{ page.label|safe }}</a></li>
+{%- endmacro -%}
+{%- macro page_link(page) -%}
+<li class="page-item"><a class="page-link" href="{{ page.path }}" rel="{{ page.querystring_key }}">{{ page.label|safe }}</a></li>
+{%- endmacro -%}
+{%- macro show_pages(pages) -%}
+<ul class="pagination">
+  {% for page in pages %}{% if page %}{% if page.is_current %}{{ current_link(page) }}{% else %}{{ page_link(page) }}{% endif %}{% endif %}{% endfor %}
+</ul>
+{%- endmacro -%}
+"""
+
+
+@pass_context
+def paginate(context, objects, per_page=None, **kwargs):
+    """Return the pagination data for *objects*.
+
+    This is the equivalent of the *paginate* template tag: the current page
+    is available as ``page`` in the returned mapping. Keyword arguments are
+    *number* (the default page number), *querystring_key* and
+    *override_path*.
+    """
+    return utils.paginate_objects(
+        context['request'],
+        objects,
+        per_page or settings.PER_PAGE,
+        default_number=kwargs.get('number', 1),
+        querystring_key=kwargs.get('querystring_key', None),
+        override_path=kwargs.get('override_path', None),
+    )
+
+
+@pass_context
+def show_pages(context, data):
+    """Show page links for the pagination *data*."""
+    pages = models.get_page_list(context['request'], data)
+    if pages.paginated():
+        extension = context.environment.extensions[
+            PaginationExtension.identifier]
+        return extension.macros.show_pages(pages.displayed_pages())
+    return ''
+
+
+@pass_context
+def show_pageitems(context, data):
+    """Show the range of the items displayed for the pagination *data*."""
+    return str(models.ShowItems(
+        context['request'],
+        data['page'],
+        data['querystring_key'],
+        default_number=data['default_number'],
+        override_path=data['override_path'],
+    ))
+
+
+class PaginationExtension(Extension):
+    """Register the pagination globals in the Jinja2 environment."""
+
+    def __init__(self, environment):
+        super(PaginationExtension, self).__init__(environment)
+        self._macros = None
+        environment.globals.update({
+            'paginate': paginate,
+            'show_pages': show_pages,
+            'show_pageitems': show_pageitems,
+        })
+
+    @property
+    def macros(self):
+        """The link macros, compiled once per environment."""
+        if self._macros is None:
+            self._macros = self.environment.from_string(MACROS).module
+        return self._macros
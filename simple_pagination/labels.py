@@ -0,0 +1,44 @@
+"""Ready-made labels of page links."""
+
+from __future__ import unicode_literals
+
+import functools
+
+from django.utils import formats, translation
+from django.utils.safestring import mark_safe
+
+from simple_pagination import settings
+
+
+# Safe arrow labels, by label HTML.
+_arrow_labels = {}
+
+
+def get_arrow_label(name):
+    """Return the safe label defined in the *name* setting.
+
+    *name* is e.g. ``'FIRST_LABEL'``: the label HTML is only marked as safe
+    once, however many times it is used.
+    """
+    label = getattr(settings.get_settings(), name)
+    try:
+        return _arrow_labels[label]
+    except KeyError:
+        return _arrow_labels.setdefault(label, mark_safe(label))
+
+
+@functools.lru_cache(maxsize=1024)
+def _localized_number_label(number, language):
+    with translation.override(language):
+        return mark_safe(formats.number_format(number, force_grouping=True))
+
+
+def get_number_label(number):
+    """Return the label of the page *number*.
+
+    The number is localized (e.g. using thousand separators or other digits)
+    for the active language if ``settings.LOCALIZE_PAGE_NUMBERS`` is True.
+    """
+    if settings.get_settings().LOCALIZE_PAGE_NUMBERS:
+        return _localized_number_label(number, translation.get_language())
+    return str(number)
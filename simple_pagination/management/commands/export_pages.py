@@ -0,0 +1,39 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from simple_pagination.export import export_pages
+
+
+class Command(BaseCommand):
+    help = 'Render every page of a model listing to static files.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', help='Model as app_label.ModelName.')
+        parser.add_argument('template', help='Template rendering one page.')
+        parser.add_argument('output_dir', help='Destination directory.')
+        parser.add_argument('--per-page', type=int, default=None)
+        parser.add_argument(
+            '--order-by', default='pk',
+            help='Comma separated ordering of the listing.')
+        parser.add_argument('--path', default='/')
+        parser.add_argument(
+            '--filename-format', default='page-{number}.html')
+        parser.add_argument('--workers', type=int, default=None)
+
+    def handle(self, *args, **options):
+        try:
+            model = apps.get_model(options['model'])
+        except (LookupError, ValueError) as err:
+            raise CommandError(str(err))
+        queryset = model._default_manager.order_by(
+            *options['order_by'].split(','))
+        filenames = export_pages(
+            queryset,
+            options['template'],
+            options['output_dir'],
+            per_page=options['per_page'],
+            path=options['path'],
+            filename_format=options['filename_format'],
+            max_workers=options['workers'],
+        )
+        self.stdout.write('Exported %d pages.' % len(filenames))
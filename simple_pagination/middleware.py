@@ -0,0 +1,96 @@
+"""Middleware exposing the pagination to API clients and selecting tenants."""
+
+from __future__ import unicode_literals
+
+from django.conf import settings as django_settings
+from django.http.request import split_domain_port
+
+from simple_pagination import models
+from simple_pagination import paginators
+from simple_pagination import settings
+from simple_pagination import utils
+
+
+def set_pagination_headers(request, response, data=None):
+    """Add the pagination headers to *response*.
+
+    The ``Link`` header (RFC 8288) points to the first, previous, next and
+    last pages. ``X-Total-Count`` is only added if the objects have already
+    been counted, and keyset pages also expose their cursors in the
+    ``X-Next-Cursor`` and ``X-Previous-Cursor`` headers.
+
+    If *data* is not given, the data of the first pagination performed
+    while handling *request* is used. Return the response.
+    """
+    if data is None:
+        collected = utils.get_data_from_request(request)
+        if not collected:
+            return response
+        data = collected[0]
+    page = data['page']
+    paginator = page.paginator
+    pages = models.get_page_list(request, data)
+    keyset = isinstance(page, paginators.KeysetPage)
+    # The total is cheap only if already retrieved to render the page.
+    counted = not keyset and 'count' in paginator.__dict__
+
+    links = [('first', pages.first())]
+    if page.has_previous():
+        links.append(('prev', pages.previous()))
+        if keyset:
+            response['X-Previous-Cursor'] = page.previous_page_number()
+    if page.has_next():
+        links.append(('next', pages.next()))
+        if keyset:
+            response['X-Next-Cursor'] = page.next_page_number()
+    if keyset or counted:
+        links.append(('last', pages.last()))
+    if counted:
+        response['X-Total-Count'] = str(paginator.count)
+
+    header = ', '.join(
+        '<{0}>; rel="{1}"'.format(request.build_absolute_uri(link.path), rel)
+        for rel, link in links)
+    if response.has_header('Link'):
+        header = response['Link'] + ', ' + header
+    response['Link'] = header
+    return response
+
+
+class PaginationLinkMiddleware(object):
+    """Add the pagination headers to paginated responses.
+
+    The headers (see *set_pagination_headers*) describe the first
+    pagination performed while handling the request, e.g. by the
+    *paginate* template tag.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        return set_pagination_headers(request, response)
+
+
+class TenantMiddleware(object):
+    """Use the pagination settings of a tenant while handling each request.
+
+    By default the tenant is the host name of the request, if it is a key
+    of the ``SIMPLE_PAGINATION_TENANTS`` setting. Override *get_tenant* to
+    select it differently. The default settings are restored once the
+    response is returned.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def get_tenant(self, request):
+        """Return the tenant of *request*, or None for the default settings."""
+        tenants = getattr(django_settings, settings.PREFIX + 'TENANTS', {})
+        host = split_domain_port(request.get_host())[0]
+        return host if host in tenants else None
+
+    def __call__(self, request):
+        with settings.override(self.get_tenant(request)):
+            return self.get_response(request)
@@ -2,15 +2,44 @@
 
 from __future__ import unicode_literals
 
+import os
+import urllib
+
 from django.template import loader
+from django.utils import formats, translation
 from django.utils.encoding import iri_to_uri
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
 
+from simple_pagination import labels
+from simple_pagination import paginators
 from simple_pagination import settings
 from simple_pagination import utils
 
 
-# Page templates cache.
+# Page templates cache: each template is stored with a flag telling if it is
+# the one shipped with this application.
 _template_cache = {}
+_templates_dir = os.path.join(os.path.dirname(__file__), 'templates')
+
+# Markup of the default link templates.
+_current_link = (
+    '<li class="page-item"><a class="page-link active">{label}</a></li>')
+_page_link = (
+    '<li class="page-item"><a class="page-link" href="{path}" '
+    'rel="{querystring_key}">{label}</a></li>')
+
+
+def _get_template(template_name):
+    try:
+        return _template_cache[template_name]
+    except KeyError:
+        pass
+    template = loader.get_template(template_name)
+    origin = getattr(template, 'origin', None)
+    is_default = origin is not None and os.path.normpath(
+        origin.name) == os.path.join(_templates_dir, template_name)
+    return _template_cache.setdefault(template_name, (template, is_default))
 
 
 class EndlessPage():
@@ -21,7 +50,8 @@ class EndlessPage():
         - *self.number*: the page number;
         - *self.label*: the label of the link
           (usually the page number as string);
-        - *self.url*: the url of the page (starting with "?");
+        - *self.url*: the url of the page (starting with "?", or the
+          path of the page if the page number is in the path);
         - *self.path*: the path of the page;
         - *self.is_current*: return True if page is the current page displayed;
         - *self.is_first*: return True if page is the first page;
@@ -34,34 +64,45 @@ class EndlessPage():
         label = kwargs.get('label', None)
         default_number = kwargs.get('default_number', 1)
         override_path = kwargs.get('override_path', None)
+        querystring_params = kwargs.get('querystring_params', None)
         self._request = request
         self.number = number
-        self.label = str(number) if label is None else label
+        if label is None:
+            label = labels.get_number_label(number)
+        self.label = label
         self.querystring_key = querystring_key
 
         self.is_current = number == current_number
         self.is_first = number == 1
         self.is_last = number == total_number
 
-        self.url = utils.get_querystring_for_page(
+        self.url, self.path = utils.get_page_path(
             request, number, self.querystring_key,
-            default_number=default_number)
-        path = iri_to_uri(override_path or request.path)
-        self.path = '{0}{1}'.format(path, self.url)
+            default_number=default_number, params=querystring_params,
+            override_path=override_path)
 
     def __str__(self):
         """Render the page as a link."""
+        if self.is_current:
+            template_name = 'simple/current_link.html'
+        else:
+            template_name = 'simple/page_link.html'
+        template, is_default = _get_template(template_name)
+        if is_default:
+            # The default templates are not overridden: just fill their
+            # markup with the ready-made (safe) label.
+            if self.is_current:
+                return mark_safe(_current_link.format(label=self.label))
+            return mark_safe(_page_link.format(
+                path=escape(self.path),
+                querystring_key=escape(self.querystring_key),
+                label=self.label,
+            ))
         context = {
             'add_nofollow': False,
             'page': self,
             'querystring_key': self.querystring_key,
         }
-        if self.is_current:
-            template_name = 'simple/current_link.html'
-        else:
-            template_name = 'simple/page_link.html'
-        template = _template_cache.setdefault(
-            template_name, loader.get_template(template_name))
         return template.render(context)
 
 
@@ -71,6 +112,7 @@ class PageList():
     def __init__(self, request, page, querystring_key, **kwargs):
         default_number = kwargs.get('default_number', None)
         override_path = kwargs.get('override_path', None)
+        querystring_params = kwargs.get('querystring_params', None)
         self._request = request
         self._page = page
         if default_number is None:
@@ -79,6 +121,7 @@ class PageList():
             self._default_number = int(default_number)
         self._querystring_key = querystring_key
         self._override_path = override_path
+        self._querystring_params = querystring_params
 
     def _endless_page(self, number, label=None):
         """Factory function that returns a *EndlessPage* instance.
@@ -89,11 +132,12 @@ class PageList():
             self._request,
             number,
             self._page.number,
-            len(self),
-            self._querystring_key,
+            total_number=len(self),
+            querystring_key=self._querystring_key,
             label=label,
             default_number=self._default_number,
             override_path=self._override_path,
+            querystring_params=self._querystring_params,
         )
 
     def __getitem__(self, value):
@@ -144,24 +188,72 @@ class PageList():
         *settings.PAGE_LIST_CALLABLE* can also be a dotted path to a callable.
         """
         if len(self) > 1:
-            pages_callable = utils.get_page_numbers
-            pages = []
-            for item in pages_callable(self._page.number, len(self)):
-                if item is None:
-                    pages.append(None)
-                elif item == 'previous':
-                    pages.append(self.previous())
-                elif item == 'next':
-                    pages.append(self.next())
-                elif item == 'first':
-                    pages.append(self.first_as_arrow())
-                elif item == 'last':
-                    pages.append(self.last_as_arrow())
-                else:
-                    pages.append(self[item])
-            return loader.render_to_string('simple/show_pages.html', {'pages': pages})
+            return loader.render_to_string(
+                'simple/show_pages.html', {'pages': self.displayed_pages()})
         return ''
 
+    def displayed_pages(self):
+        """Return the sequence of pages displayed by the pagination.
+
+        Items are *EndlessPage* instances, or None for separators.
+        """
+        pages_callable = utils.get_page_numbers
+        pages = []
+        for item in pages_callable(self._page.number, len(self)):
+            if item is None:
+                pages.append(None)
+            elif item == 'previous':
+                pages.append(self.previous())
+            elif item == 'next':
+                pages.append(self.next())
+            elif item == 'first':
+                pages.append(self.first_as_arrow())
+            elif item == 'last':
+                pages.append(self.last_as_arrow())
+            else:
+                pages.append(self[item])
+        return pages
+
+    def links(self, numbers=None):
+        """Return a list of *(label, href, is_current)* tuples.
+
+        The links are generated for the given page *numbers* (all the pages
+        if None) in a single pass, without creating an *EndlessPage* for
+        each number: this is useful to render big jump menus or footers
+        listing all the pages. Labels are the ones of the *EndlessPage*
+        objects, e.g. localized if ``settings.LOCALIZE_PAGE_NUMBERS`` is True.
+        """
+        if numbers is None:
+            numbers = range(1, len(self) + 1)
+        path = iri_to_uri(self._override_path or self._request.path)
+        base = utils.get_querystring_base(
+            self._request, self._querystring_key, self._querystring_params)
+        path_prefix = None if self._override_path else utils.get_path_prefix(
+            self._request, self._querystring_key)
+        if path_prefix is None:
+            default_href = path + '?' + base if base else path
+            prefix = '{0}?{1}{2}='.format(
+                path, base + '&' if base else '',
+                urllib.parse.quote_plus(self._querystring_key))
+            suffix = ''
+        else:
+            # The page number is in the path.
+            path_prefix = iri_to_uri(path_prefix)
+            suffix = '/?' + base if base else '/'
+            default_href = path_prefix + suffix[1:]
+            prefix = '{0}{1}/'.format(
+                path_prefix, urllib.parse.quote(self._querystring_key))
+        # Labels can be localized: hrefs always use the digits.
+        get_label = labels.get_number_label
+        default_number = self._default_number
+        current_number = self._page.number
+        return [
+            (get_label(number), default_href if number == default_number
+             else prefix + str(number) + suffix,
+             number == current_number)
+            for number in map(int, numbers)
+        ]
+
     def current(self):
         """Return the current page."""
         return self._endless_page(self._page.number)
@@ -191,14 +283,14 @@ class PageList():
 
         The page label (arrow) is defined in ``settings.FIRST_LABEL``.
         """
-        return self.first(label=settings.FIRST_LABEL)
+        return self.first(label=labels.get_arrow_label('FIRST_LABEL'))
 
     def last_as_arrow(self):
         """Return the last page as an arrow.
 
         The page label (arrow) is defined in ``settings.LAST_LABEL``.
         """
-        return self.last(label=settings.LAST_LABEL)
+        return self.last(label=labels.get_arrow_label('LAST_LABEL'))
 
     def previous(self):
         """Return the previous page.
@@ -209,7 +301,7 @@ class PageList():
         if self._page.has_previous():
             return self._endless_page(
                 self._page.previous_page_number(),
-                label=settings.PREVIOUS_LABEL)
+                label=labels.get_arrow_label('PREVIOUS_LABEL'))
         return ''
 
     def next(self):
@@ -221,7 +313,7 @@ class PageList():
         if self._page.has_next():
             return self._endless_page(
                 self._page.next_page_number(),
-                label=settings.NEXT_LABEL)
+                label=labels.get_arrow_label('NEXT_LABEL'))
         return ''
 
     def paginated(self):
@@ -229,19 +321,92 @@ class PageList():
         return len(self) > 1
 
 
-class ShowItems():
-    """A page link representation.
+class KeysetPageList(PageList):
+    """A sequence of pages navigated by cursors.
 
-    Interesting attributes:
+    Used for pages of a *paginators.KeysetPaginator*: since the pages are not
+    numbered, only the first, previous, next and last pages are displayed.
+    The *default_number* is either 1 or the last page cursor, if the last
+    page is displayed by default.
+    """
 
-        - *self.number*: the page number;
-        - *self.label*: the label of the link
-          (usually the page number as string);
-        - *self.url*: the url of the page (starting with "?");
-        - *self.path*: the path of the page;
-        - *self.is_current*: return True if page is the current page displayed;
-        - *self.is_first*: return True if page is the first page;
-        - *self.is_last*:  return True if page is the last page.
+    def __init__(self, request, page, querystring_key, **kwargs):
+        default_number = kwargs.pop('default_number', None)
+        super(KeysetPageList, self).__init__(
+            request, page, querystring_key, **kwargs)
+        self._default_number = default_number or 1
+
+    def _endless_page(self, number, label=None):
+        # The total number of pages is unknown.
+        return EndlessPage(
+            self._request,
+            number,
+            self._page.number,
+            querystring_key=self._querystring_key,
+            label=label,
+            default_number=self._default_number,
+            override_path=self._override_path,
+            querystring_params=self._querystring_params,
+        )
+
+    def __str__(self):
+        """Return the rendered arrows pointing to the neighbour pages."""
+        if self.paginated():
+            return loader.render_to_string(
+                'simple/show_pages.html', {'pages': self.displayed_pages()})
+        return ''
+
+    def displayed_pages(self):
+        """Return the sequence of pages displayed by the pagination."""
+        pages = []
+        if self._page.has_previous():
+            pages.extend([self.first_as_arrow(), self.previous()])
+        if self._page.has_next():
+            pages.extend([self.next(), self.last_as_arrow()])
+        return pages
+
+    def first(self, label=None):
+        """Return the first page."""
+        if self._default_number == 1:
+            return self._endless_page(1, label=label)
+        # The last page is displayed by default: the first one needs a cursor.
+        return self._endless_page(
+            self._page.paginator.first_cursor, label=label)
+
+    def last(self, label=None):
+        """Return the last page."""
+        return self._endless_page(
+            self._page.paginator.last_cursor, label=label)
+
+    def paginated(self):
+        """Return True if there are pages other than the current one."""
+        return self._page.has_other_pages()
+
+
+def get_page_list(request, data):
+    """Return the page list for the pagination *data* stored in context."""
+    if isinstance(data['page'], paginators.KeysetPage):
+        page_list_class = KeysetPageList
+    else:
+        page_list_class = PageList
+    return page_list_class(
+        request,
+        data['page'],
+        data['querystring_key'],
+        default_number=data['default_number'],
+        override_path=data['override_path'],
+        querystring_params=data.get('querystring_params'),
+    )
+
+
+class ShowItems():
+    """The range of the items displayed in the current page.
+
+    The text is built from ``settings.SHOW_ITEMS_FORMAT`` using only the
+    page indexes and the total count, so that the page objects are never
+    evaluated. It is cached on the page object. Pages of a
+    *paginators.KeysetPaginator* are not counted, hence their range is
+    unknown: nothing is displayed for them.
     """
 
     def __init__(self, request, page, querystring_key, **kwargs):
@@ -257,34 +422,15 @@ class ShowItems():
         self._override_path = override_path
 
     def __str__(self):
-        """Render the page as a link."""
-        str_data = "Showing "
-        if self._page.paginator.count == 1:
-            str_data += str(1)
-            str_data = str_data + " to " + str(len(self._page.object_list)) + " of " + str(len(self._page.object_list))
-        else:
-            if self._page.number == 1:
-                str_data += str(1)
-                if self._page.paginator.per_page == str(self._page.paginator.count):
-                    str_data = str_data + " to " + str(self._page.paginator.per_page) + " of " + str(self._page.paginator.count)
-                else:
-                    str_data = str_data + " to " + str(len(self._page.object_list)) + " of " + str(self._page.paginator.count)
-            else:
-                if self._page.has_next():
-                    str_data += "".join(map(str, [
-                        (self._page.paginator.per_page * self._page.previous_page_number()) + 1,
-                        " to ",
-                        self._page.paginator.per_page * self._page.number,
-                        " of ",
-                        self._page.paginator.count
-                    ]))
-                else:
-                    str_data += "".join(map(str, [
-                        self._page.paginator.per_page * self._page.previous_page_number() + 1,
-                        " to ",
-                        self._page.paginator.count,
-                        " of ",
-                        self._page.paginator.count
-                    ]))
-
-        return str_data + " items"
+        """Render the range of the displayed items."""
+        if isinstance(self._page, paginators.KeysetPage):
+            return ''
+        cache = self._page.__dict__.setdefault('_show_items_cache', {})
+        key = (settings.SHOW_ITEMS_FORMAT, translation.get_language())
+        if key not in cache:
+            cache[key] = settings.SHOW_ITEMS_FORMAT.format(
+                start=formats.localize(self._page.start_index()),
+                end=formats.localize(self._page.end_index()),
+                total=formats.localize(self._page.paginator.count),
+            )
+        return cache[key]
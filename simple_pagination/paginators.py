@@ -0,0 +1,604 @@
+"""Paginators complementing the Django one."""
+
+from __future__ import unicode_literals
+
+import array
+import collections.abc
+import functools
+import hashlib
+import heapq
+import itertools
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import caches
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import (
+    EmptyPage,
+    Page,
+    PageNotAnInteger,
+    Paginator,
+)
+from django.db import connections
+from django.db.models import Count, F, Q, Window
+from django.db.models.expressions import OrderBy
+from django.db.models.query import (
+    ModelIterable,
+    QuerySet,
+    RawQuerySet,
+    ValuesIterable,
+)
+from django.utils.crypto import get_random_string
+from django.utils.functional import cached_property
+
+from simple_pagination import cursor
+from simple_pagination import settings
+
+
+# Cursor directions.
+NEXT, PREVIOUS, FIRST, LAST = 'n', 'p', 'f', 'l'
+
+
+class LazyObjectList(collections.abc.Sequence):
+    """The objects of a page, fetched the first time they are used.
+
+    *fetch* is called without arguments and must return a list: its result
+    is cached, so that it is called at most once. The page number, indexes
+    and links never need the objects, and templates not displaying them do
+    not pay for the query.
+    """
+
+    def __init__(self, fetch):
+        self._fetch = fetch
+        self._objects = None
+
+    @property
+    def objects(self):
+        """The fetched objects."""
+        if self._objects is None:
+            self._objects = self._fetch()
+        return self._objects
+
+    def __len__(self):
+        return len(self.objects)
+
+    def __getitem__(self, index):
+        return self.objects[index]
+
+    def __iter__(self):
+        return iter(self.objects)
+
+    def __bool__(self):
+        return bool(self.objects)
+
+    __nonzero__ = __bool__
+
+    def __repr__(self):
+        if self._objects is None:
+            return '<LazyObjectList (not fetched)>'
+        return repr(self._objects)
+
+
+def get_keyset_ordering(queryset):
+    """Return the ordering of *queryset* as a list of (field, descending).
+
+    The primary key is appended if missing, so that the ordering is total.
+    Raise a *ValueError* if the queryset is ordered by something other than
+    model fields.
+    """
+    query = queryset.query
+    meta = query.get_meta()
+    fields = query.order_by
+    if not fields and query.default_ordering:
+        fields = meta.ordering
+    ordering = []
+    for field in fields:
+        if isinstance(field, OrderBy) and isinstance(field.expression, F):
+            ordering.append((field.expression.name, field.descending))
+        elif isinstance(field, F):
+            ordering.append((field.name, False))
+        elif isinstance(field, str) and field != '?':
+            ordering.append((field.lstrip('-+'), field.startswith('-')))
+        else:
+            raise ValueError(
+                'Keyset pagination requires an ordering by model fields.')
+    if not any(name in ('pk', meta.pk.name, meta.pk.attname)
+               for name, _ in ordering):
+        ordering.append(('pk', False))
+    return ordering
+
+
+def _get_value(obj, name):
+    for attr in name.split('__'):
+        obj = getattr(obj, attr)
+    return getattr(obj, 'pk', obj)
+
+
+def _keyset_filter(ordering, values, reverse=False):
+    """Return the condition selecting rows after *values* in *ordering*.
+
+    Rows before *values* are selected if *reverse* is True.
+    """
+    condition, equal = Q(), {}
+    for (name, descending), value in zip(ordering, values):
+        lookup = 'lt' if descending != reverse else 'gt'
+        condition |= Q(**equal) & Q(**{'{0}__{1}'.format(name, lookup): value})
+        equal[name] = value
+    return condition
+
+
+def get_page_number_for_object(queryset, obj, per_page):
+    """Return the number of the page of *queryset* containing *obj*.
+
+    The objects preceding *obj* in the queryset ordering are counted with a
+    single query, which can use the index on the ordering fields. Other
+    sequences (e.g. lists) are searched for *obj*: the first page is
+    returned if it is missing. Raise a *TypeError* if the objects cannot be
+    searched, e.g. for raw querysets.
+    """
+    if not isinstance(queryset, QuerySet):
+        try:
+            index = queryset.index(obj)
+        except AttributeError:
+            raise TypeError(
+                'Cannot find the page containing an object of a {0}.'.format(
+                    type(queryset).__name__))
+        except ValueError:
+            return 1
+        return index // int(per_page) + 1
+    ordering = get_keyset_ordering(queryset)
+    values = [_get_value(obj, name) for name, _ in ordering]
+    preceding = queryset.filter(
+        _keyset_filter(ordering, values, reverse=True)).count()
+    return preceding // int(per_page) + 1
+
+
+class KeysetPage(object):
+    """A page of a *KeysetPaginator*.
+
+    Neighbour pages are identified by signed cursors instead of numbers:
+    *previous_page_number* and *next_page_number* return those cursors, so
+    that page links can be built as usual.
+    """
+
+    def __init__(self, object_list, number, paginator, **kwargs):
+        self.object_list = object_list
+        self.number = number
+        self.paginator = paginator
+        self._has_next = kwargs.get('has_next', False)
+        self._has_previous = kwargs.get('has_previous', False)
+
+    def __repr__(self):
+        return '<Page %s>' % self.number
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    def next_page_number(self):
+        if not self.object_list:
+            raise EmptyPage('That page has no results')
+        return self.paginator.get_cursor(NEXT, self.object_list[-1])
+
+    def previous_page_number(self):
+        if not self.object_list:
+            return self.paginator.last_cursor
+        return self.paginator.get_cursor(PREVIOUS, self.object_list[0])
+
+
+class KeysetPaginator(object):
+    """Paginate a queryset seeking rows by the values of its ordering.
+
+    Every page, including the previous and the last ones, is retrieved with
+    a single query reading at most *per_page* + 1 rows, whatever the size of
+    the table: previous pages and the last page are fetched by reversing
+    the ordering. Ordering fields should be indexed and not nullable.
+
+    The queryset must return model instances: the cursors are built from
+    their attributes, hence e.g. ``values()`` querysets raise a
+    *ValueError*.
+    """
+
+    def __init__(self, object_list, per_page):
+        if object_list._iterable_class is not ModelIterable:
+            raise ValueError(
+                'Keyset pagination requires a queryset of model instances.')
+        self.ordering = get_keyset_ordering(object_list)
+        self.object_list = object_list.order_by(*[
+            '-' + name if descending else name
+            for name, descending in self.ordering])
+        self.per_page = int(per_page)
+
+    @property
+    def first_cursor(self):
+        """The cursor pointing to the first page."""
+        return cursor.encode_cursor((FIRST,))
+
+    @property
+    def last_cursor(self):
+        """The cursor pointing to the last page."""
+        return cursor.encode_cursor((LAST,))
+
+    def get_cursor(self, direction, obj):
+        """Return the cursor of the page next to *obj* in *direction*."""
+        values = [_get_value(obj, name) for name, _ in self.ordering]
+        return cursor.encode_cursor([direction] + values)
+
+    def _fetch(self, position):
+        """Return an *(objects, has_next, has_previous)* tuple."""
+        per_page = self.per_page
+        direction = position[0] if position else None
+        values = position[1:] if position else ()
+        if direction in (NEXT, PREVIOUS) and len(values) != len(
+                self.ordering):
+            direction = None
+        if direction == NEXT:
+            queryset = self.object_list.filter(
+                _keyset_filter(self.ordering, values))
+            objects = list(queryset[:per_page + 1])
+            return objects[:per_page], len(objects) > per_page, True
+        if direction in (PREVIOUS, LAST):
+            queryset = self.object_list.reverse()
+            if direction == PREVIOUS:
+                queryset = queryset.filter(
+                    _keyset_filter(self.ordering, values, reverse=True))
+            objects = list(queryset[:per_page + 1])
+            has_previous = len(objects) > per_page
+            objects = objects[:per_page]
+            objects.reverse()
+            return objects, direction == PREVIOUS, has_previous
+        objects = list(self.object_list[:per_page + 1])
+        return objects[:per_page], len(objects) > per_page, False
+
+    def page(self, position=None):
+        """Return the page at *position*.
+
+        *position* is a decoded cursor (see *utils.get_cursor_from_request*),
+        or None for the first page. Raise *EmptyPage* if a page other than
+        the first has no objects.
+        """
+        objects, has_next, has_previous = self._fetch(position)
+        if not objects and position:
+            raise EmptyPage('That page contains no results')
+        number = cursor.encode_cursor(position) if position else 1
+        return KeysetPage(
+            objects, number, self,
+            has_next=has_next, has_previous=has_previous)
+
+
+class SnapshotPaginator(Paginator):
+    """Paginate a queryset using a snapshot of its ordered primary keys.
+
+    The first time, the whole ordered list of primary keys is retrieved and
+    stored, compressed, in the ``settings.SNAPSHOT_CACHE`` cache, under a
+    token that page links carry in the ``settings.SNAPSHOT_LABEL``
+    querystring key. Other pages just slice the snapshot and fetch their
+    objects by primary key, without running the queryset filters and
+    ordering again: this is useful for expensive (e.g. search) querysets.
+    The related objects to select or prefetch and the deferred fields are
+    kept, but querysets with annotations or extra selects, or returning
+    e.g. ``values()`` rows, are filtered again, as their objects depend on
+    the query.
+
+    Only integer primary keys are supported. If the queryset has more than
+    ``settings.SNAPSHOT_MAX_SIZE`` objects, it is paginated as usual: this
+    is remembered in the cache, so that the primary keys are not scanned
+    again on the next requests. Querysets that cannot match any object
+    (e.g. ``none()``) and other sequences are paginated as usual too.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(SnapshotPaginator, self).__init__(*args, **kwargs)
+        self.token = None
+        self._pks = None
+
+    @cached_property
+    def _query_hash(self):
+        if not isinstance(self.object_list, QuerySet):
+            return None
+        try:
+            sql = str(self.object_list.query)
+        except EmptyResultSet:
+            # The queryset cannot match any object.
+            return None
+        return hashlib.md5(sql.encode('utf-8')).hexdigest()
+
+    def _cache_key(self, token):
+        # Snapshots are bound to the query they were created for.
+        return 'simple_pagination.snapshot.{0}.{1}'.format(
+            self._query_hash, token)
+
+    def load_snapshot(self, token):
+        """Use the snapshot stored under *token*.
+
+        Return False if the snapshot is not available.
+        """
+        if not token or not token.isalnum() or self._query_hash is None:
+            return False
+        data = caches[settings.SNAPSHOT_CACHE].get(self._cache_key(token))
+        if data is None:
+            return False
+        self._pks = array.array('q')
+        self._pks.frombytes(zlib.decompress(data))
+        self.token = token
+        self.count = len(self._pks)
+        return True
+
+    def create_snapshot(self):
+        """Store the ordered primary keys of the objects in a new snapshot.
+
+        Return False if the snapshot cannot be created.
+        """
+        if self._query_hash is None:
+            return False
+        cache = caches[settings.SNAPSHOT_CACHE]
+        max_size = settings.SNAPSHOT_MAX_SIZE
+        # Tokens are alphanumeric: this key cannot be requested as a token.
+        too_large_key = self._cache_key('large.{0}'.format(max_size))
+        if cache.get(too_large_key):
+            return False
+        pks = list(self.object_list.values_list('pk', flat=True)[
+            :max_size + 1])
+        if len(pks) > max_size:
+            cache.set(too_large_key, True, settings.SNAPSHOT_TIMEOUT)
+            return False
+        try:
+            self._pks = array.array('q', pks)
+        except (TypeError, OverflowError):
+            return False
+        self.token = get_random_string(16)
+        self.count = len(self._pks)
+        cache.set(
+            self._cache_key(self.token),
+            zlib.compress(self._pks.tobytes()),
+            settings.SNAPSHOT_TIMEOUT)
+        return True
+
+    def _get_objects(self, pks):
+        # Return the queryset of the objects with primary key in *pks*.
+        queryset = self.object_list
+        query = queryset.query
+        if (query.annotations or query.extra or
+                queryset._iterable_class is not ModelIterable):
+            return queryset.order_by().filter(pk__in=pks)
+        objects = queryset.model._base_manager.db_manager(
+            queryset.db).filter(pk__in=pks)
+        objects.query.select_related = query.select_related
+        objects.query.deferred_loading = query.deferred_loading
+        objects._prefetch_related_lookups = queryset._prefetch_related_lookups
+        return objects
+
+    def page(self, number):
+        """Return a *Page* object for the given 1-based page number."""
+        if self._pks is None:
+            return super(SnapshotPaginator, self).page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        pks = self._pks[bottom:bottom + self.per_page].tolist()
+
+        def fetch():
+            positions = dict((pk, index) for index, pk in enumerate(pks))
+            return sorted(
+                self._get_objects(pks), key=lambda obj: positions[obj.pk])
+        return Page(LazyObjectList(fetch), number, self)
+
+
+@functools.total_ordering
+class _Descending(object):
+    """Invert the ordering of a value when merging shards."""
+
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+    def __lt__(self, other):
+        return self.value > other.value
+
+
+def _call_in_thread(func, queryset):
+    try:
+        return func(queryset)
+    finally:
+        # Connections are thread local: close the one opened by this thread.
+        connections[queryset.db].close()
+
+
+class Shards(object):
+    """Ordered querysets to be paginated together by *ShardedPaginator*.
+
+    Usage::
+
+        entries = Shards(*[
+            Entry.objects.using(alias).order_by('-created', 'id')
+            for alias in ('tenant1', 'tenant2')])
+
+    All the querysets must be ordered in the same way.
+    """
+
+    def __init__(self, *querysets):
+        self.querysets = querysets
+
+    def __len__(self):
+        return len(self.querysets)
+
+    def map(self, func):
+        """Return the results of *func* called with each queryset.
+
+        Querysets on different databases are processed in parallel threads.
+        """
+        if len(set(queryset.db for queryset in self.querysets)) < 2:
+            return [func(queryset) for queryset in self.querysets]
+        with ThreadPoolExecutor(max_workers=len(self.querysets)) as executor:
+            return list(executor.map(
+                functools.partial(_call_in_thread, func), self.querysets))
+
+
+class ShardedPaginator(Paginator):
+    """Paginate *Shards*, merging the ordered querysets.
+
+    The count is the sum of the counts of the shards, and each page is
+    built fetching the first *offset* + *per_page* objects of each shard,
+    and merging them on the shared ordering.
+    """
+
+    @cached_property
+    def count(self):
+        """Return the total number of objects, across all shards."""
+        return sum(self.object_list.map(lambda queryset: queryset.count()))
+
+    @cached_property
+    def _sort_key(self):
+        ordering = get_keyset_ordering(self.object_list.querysets[0])
+
+        def sort_key(obj):
+            return tuple(
+                _Descending(_get_value(obj, name)) if descending
+                else _get_value(obj, name)
+                for name, descending in ordering)
+        return sort_key
+
+    def page(self, number):
+        """Return a *Page* object for the given 1-based page number."""
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        if top + self.orphans >= self.count:
+            top = self.count
+
+        def fetch():
+            objects = heapq.merge(
+                *self.object_list.map(lambda queryset: list(queryset[:top])),
+                key=self._sort_key)
+            return list(itertools.islice(objects, bottom, top))
+        return Page(LazyObjectList(fetch), number, self)
+
+
+class RawQueryPaginator(Paginator):
+    """Paginate a *RawQuerySet* pushing LIMIT and OFFSET down to the database.
+
+    The raw SQL is wrapped as a subquery: a page is retrieved selecting only
+    its rows, returned as model instances like when iterating the raw
+    queryset, and the objects are counted only if the total cannot be
+    deduced from the page itself.
+    """
+
+    @property
+    def _connection(self):
+        return connections[self.object_list.db]
+
+    @property
+    def _sql(self):
+        return self.object_list.raw_query.strip().rstrip(';')
+
+    @cached_property
+    def count(self):
+        """Return the total number of rows of the raw query."""
+        with self._connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT COUNT(*) FROM ({0}) subquery'.format(self._sql),
+                self.object_list.params)
+            return cursor.fetchone()[0]
+
+    def page(self, number):
+        """Return a *Page* object for the given 1-based page number."""
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        bottom = (number - 1) * self.per_page
+        # The limit and offset are integers added to the SQL by the
+        # database backend: the params of the raw query (a sequence or a
+        # mapping) are left untouched.
+        raw = self.object_list
+        sql = 'SELECT * FROM ({0}) subquery {1}'.format(
+            self._sql, self._connection.ops.limit_offset_sql(
+                bottom, bottom + self.per_page + 1))
+        rows = list(RawQuerySet(
+            sql, model=raw.model, params=raw.params,
+            translations=raw.translations, using=raw.db))
+        if not rows and number > 1:
+            raise EmptyPage('That page contains no results')
+        if len(rows) <= self.per_page and 'count' not in self.__dict__:
+            # This is the last page: the count is known.
+            self.count = bottom + len(rows)
+        return Page(rows[:self.per_page], number, self)
+
+
+class WindowCountPaginator(Paginator):
+    """Paginate a queryset retrieving the count along with the page objects.
+
+    The page slice is annotated with a ``COUNT(*) OVER ()`` window, so that a
+    single query returns both the objects and the total. If the count is
+    already known, or the database does not support window functions, or the
+    queryset is distinct, combined or does not return model instances or
+    dicts, the queryset is paginated as usual.
+
+    Pages past the end have no rows, and hence no count: *EmptyPage* is
+    raised for them.
+    """
+
+    count_alias = 'simple_pagination_count'
+
+    def _use_window(self):
+        queryset = self.object_list
+        return (
+            isinstance(queryset, QuerySet) and
+            queryset._iterable_class in (ModelIterable, ValuesIterable) and
+            not queryset.query.distinct and
+            not queryset.query.combinator and
+            connections[queryset.db].features.supports_over_clause
+        )
+
+    def page(self, number):
+        """Return a *Page* object for the given 1-based page number."""
+        if 'count' in self.__dict__ or not self._use_window():
+            return super(WindowCountPaginator, self).page(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list.annotate(**{
+            self.count_alias: Window(Count('*')),
+        })[bottom:bottom + self.per_page + self.orphans])
+        counts = [
+            row.pop(self.count_alias) if isinstance(row, dict)
+            else row.__dict__.pop(self.count_alias)
+            for row in rows]
+        if not counts and number > 1:
+            raise EmptyPage('That page contains no results')
+        self.count = counts[0] if counts else 0
+        # The count is known: orphans and empty pages are handled as usual.
+        number = self.validate_number(number)
+        top = bottom + self.per_page
+        if top + self.orphans >= self.count:
+            top = self.count
+        return Page(rows[:top - bottom], number, self)
+
+
+def get_paginator_class(objects):
+    """Return the paginator class suitable for *objects*."""
+    if isinstance(objects, Shards):
+        return ShardedPaginator
+    if isinstance(objects, RawQuerySet):
+        return RawQueryPaginator
+    return Paginator
@@ -0,0 +1,79 @@
+"""Page numbers in the URL path, e.g. ``/articles/page/3/``.
+
+Use *page_path* in your URLconf instead of *django.urls.path*::
+
+    from simple_pagination.paths import page_path
+
+    urlpatterns = [
+        ...
+    ] + page_path('articles/', views.articles, name='articles')
+
+Both ``/articles/`` and ``/articles/page/<number>/`` are routed to the view,
+the pagination reads the page number from the path, and page links are
+generated as paths (the other querystring parameters are preserved).
+"""
+
+from __future__ import unicode_literals
+
+import functools
+
+from django.urls import path, register_converter
+
+from simple_pagination import settings
+
+
+# The URL keyword argument of the page number.
+PAGE_KWARG = 'simple_pagination_page'
+
+# The name of the path converter of page numbers, namespaced so that it
+# does not replace the converters of the project.
+PAGE_CONVERTER = 'simple_pagination_page'
+
+
+class PageConverter(object):
+    """Match a page number (a positive integer) in a URL path."""
+
+    regex = '[1-9][0-9]*'
+
+    def to_python(self, value):
+        return int(value)
+
+    def to_url(self, value):
+        return str(value)
+
+
+register_converter(PageConverter, PAGE_CONVERTER)
+
+
+def _paginated_view(view, querystring_key):
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        number = kwargs.pop(PAGE_KWARG, None)
+        prefix = request.path
+        if number is not None:
+            # Strip the "<key>/<number>/" segment.
+            prefix = prefix[:-len('{0}/{1}/'.format(querystring_key, number))]
+        request.__dict__.setdefault('_simple_pagination_paths', {})[
+            querystring_key] = (prefix, number)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def page_path(route, view, kwargs=None, name=None, querystring_key=None):
+    """Return the URL patterns of a view paginated using URL paths.
+
+    *route* must be empty or end with a slash. The page number follows
+    *querystring_key* (by default ``settings.PAGE_LABEL``) in the path. Both
+    patterns share *name*, e.g. ``reverse('articles', kwargs={PAGE_KWARG:
+    3})`` returns the URL of the third page.
+    """
+    if route and not route.endswith('/'):
+        raise ValueError('Paginated routes must end with a slash.')
+    querystring_key = querystring_key or settings.PAGE_LABEL
+    view = _paginated_view(view, querystring_key)
+    return [
+        path(route, view, kwargs, name),
+        path('{0}{1}/<{2}:{3}>/'.format(
+            route, querystring_key, PAGE_CONVERTER, PAGE_KWARG),
+            view, kwargs, name),
+    ]
@@ -1,12 +1,150 @@
-from django.conf import settings
-
-PER_PAGE = getattr(settings, 'SIMPLE_PAGINATION_PER_PAGE', 10)
-PAGE_LABEL = getattr(settings, 'SIMPLE_PAGINATION_PAGE_LABEL', 'page')
-NEXT_LABEL = getattr(
-    settings, 'SIMPLE_PAGINATION_NEXT_LABEL', '<span aria-hidden="true">&gt;</span>')
-PREVIOUS_LABEL = getattr(
-    settings, 'SIMPLE_PAGINATION_PREVIOUS_LABEL', '<span aria-hidden="true">&lt;</span>')
-LAST_LABEL = getattr(
-    settings, 'SIMPLE_PAGINATION_LAST_LABEL', '<span aria-hidden="true">&gt;&gt;</span>')
-FIRST_LABEL = getattr(
-    settings, 'SIMPLE_PAGINATION_FIRST_LABEL', '<span aria-hidden="true">&lt;&lt;</span>')
+"""Django Simple Pagination settings.
+
+Settings are read from the Django settings, prefixed with
+``SIMPLE_PAGINATION_``, e.g. ``settings.PER_PAGE`` is the value of
+``SIMPLE_PAGINATION_PER_PAGE``. They are collected in an immutable snapshot
+the first time they are used, and collected again when the Django settings
+change (e.g. using *override_settings* in tests).
+
+Per tenant (or per site) values can be defined in the
+``SIMPLE_PAGINATION_TENANTS`` setting, e.g.::
+
+    SIMPLE_PAGINATION_TENANTS = {
+        'shop': {'PER_PAGE': 24},
+    }
+
+and used in a block with ``override('shop')``, or for each request with
+*simple_pagination.middleware.TenantMiddleware*.
+"""
+
+import contextlib
+import sys
+import types
+
+from asgiref.local import Local
+from django.conf import settings as django_settings
+from django.core.signals import setting_changed
+
+
+DEFAULTS = {
+    'PER_PAGE': 10,
+    'PAGE_LABEL': 'page',
+    'NEXT_LABEL': '<span aria-hidden="true">&gt;</span>',
+    'PREVIOUS_LABEL': '<span aria-hidden="true">&lt;</span>',
+    'LAST_LABEL': '<span aria-hidden="true">&gt;&gt;</span>',
+    'FIRST_LABEL': '<span aria-hidden="true">&lt;&lt;</span>',
+    'SHOW_ITEMS_FORMAT': 'Showing {start} to {end} of {total} items',
+    'LOCALIZE_PAGE_NUMBERS': False,
+    'PATH_CACHE_SIZE': 4096,
+    'PATH_CACHE_MEMORY': 4 * 1024 * 1024,
+    'SNAPSHOT_LABEL': 'snapshot',
+    'SNAPSHOT_CACHE': 'default',
+    'SNAPSHOT_TIMEOUT': 600,
+    'SNAPSHOT_MAX_SIZE': 100000,
+    'PER_PAGE_LABEL': 'per_page',
+    'PER_PAGE_ALLOWED': (),
+    'PER_PAGE_MAX': None,
+}
+PREFIX = 'SIMPLE_PAGINATION_'
+
+
+class Settings(object):
+    """An immutable snapshot of the settings."""
+
+    __slots__ = tuple(DEFAULTS)
+
+    def __init__(self, tenant=None):
+        values = dict(
+            (name, getattr(django_settings, PREFIX + name, default))
+            for name, default in DEFAULTS.items())
+        if tenant is not None:
+            tenants = getattr(django_settings, PREFIX + 'TENANTS', {})
+            try:
+                overrides = tenants[tenant]
+            except KeyError:
+                raise LookupError('Unknown pagination tenant %r.' % tenant)
+            unknown = set(overrides) - set(DEFAULTS)
+            if unknown:
+                raise AttributeError(
+                    'Unknown pagination settings: %s.' % ', '.join(unknown))
+            values.update(overrides)
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Pagination settings are read-only.')
+
+
+# Snapshots by tenant, and the active tenant. Like the active language of
+# *django.utils.translation*, the tenant is local to each thread and to each
+# asynchronous task, so that concurrent requests are isolated under ASGI.
+_snapshots = {}
+_active = Local()
+# Looking up the active tenant is not free: it is skipped until a tenant is
+# activated for the first time.
+_tenants_used = False
+
+
+def get_settings():
+    """Return the settings snapshot of the active tenant.
+
+    Call it once to read several settings, e.g. in a loop: each attribute
+    of this module looks up the active tenant.
+    """
+    tenant = getattr(_active, 'tenant', None) if _tenants_used else None
+    try:
+        return _snapshots[tenant]
+    except KeyError:
+        return _snapshots.setdefault(tenant, Settings(tenant))
+
+
+def activate(tenant):
+    """Use the settings of *tenant* in the current thread or task."""
+    global _tenants_used
+    if tenant not in _snapshots:
+        _snapshots.setdefault(tenant, Settings(tenant))
+    if tenant is not None:
+        _tenants_used = True
+    _active.tenant = tenant
+
+
+def deactivate():
+    """Use the default settings in the current thread or task."""
+    _active.tenant = None
+
+
+@contextlib.contextmanager
+def override(tenant):
+    """Use the settings of *tenant* in the current thread or task in a block.
+
+    The previously active tenant is restored on exit, even if an exception
+    is raised, so that the tenant does not leak to the next request handled
+    by the thread or task.
+    """
+    previous = getattr(_active, 'tenant', None)
+    activate(tenant)
+    try:
+        yield
+    finally:
+        _active.tenant = previous
+
+
+def _reset(**kwargs):
+    if kwargs['setting'].startswith(PREFIX):
+        _snapshots.clear()
+
+
+setting_changed.connect(_reset)
+
+
+class _SettingsModule(types.ModuleType):
+    """Give access to the active settings as module attributes."""
+
+    def __getattr__(self, name):
+        if name in DEFAULTS:
+            return getattr(get_settings(), name)
+        raise AttributeError(
+            'module %r has no attribute %r' % (self.__name__, name))
+
+
+sys.modules[__name__].__class__ = _SettingsModule
@@ -0,0 +1,106 @@
+"""Streaming responses of paginated objects."""
+
+from __future__ import unicode_literals
+
+import itertools
+
+from django.db.models.query import QuerySet
+from django.http import StreamingHttpResponse
+from django.template import Template, loader
+from django.template.context import make_context
+from django.utils.safestring import mark_safe
+
+from simple_pagination import models
+from simple_pagination import settings
+from simple_pagination import utils
+
+
+def iter_chunks(object_list, chunk_size):
+    """Yield the objects of *object_list* in lists of *chunk_size* items.
+
+    Querysets (e.g. the object list of a page) are fetched using a
+    server-side cursor, so that only a chunk is kept in memory.
+    """
+    if isinstance(object_list, QuerySet):
+        objects = object_list.iterator(chunk_size=chunk_size)
+    else:
+        objects = iter(object_list)
+    while True:
+        chunk = list(itertools.islice(objects, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _render_chunks(template, context, request, chunks):
+    """Yield *template* rendered for each chunk of objects in *chunks*.
+
+    Django templates are rendered with the same context, pushing the chunk
+    as *object_list*: the context processors only run once.
+    """
+    engine_template = getattr(template, 'template', None)
+    if not isinstance(engine_template, Template):
+        for chunk in chunks:
+            yield template.render(dict(context, object_list=chunk), request)
+        return
+    context = make_context(
+        context, request, autoescape=template.backend.engine.autoescape)
+    with context.bind_template(engine_template):
+        context.template_name = engine_template.name
+        for chunk in chunks:
+            with context.push(object_list=chunk):
+                yield engine_template.render(context)
+
+
+def stream_page(request, objects, template_name, per_page=None, **kwargs):
+    """Return a *StreamingHttpResponse* rendering the current page of *objects*.
+
+    The optional *header_template* is rendered first, then *template_name*
+    is rendered for each chunk of *chunk_size* objects (available as
+    *object_list*), and the optional *footer_template* is rendered last.
+    All the templates receive the *context* mapping, the pagination data as
+    ``endless``, and the already rendered ``show_pages`` and
+    ``show_pageitems`` markup. Other keyword arguments are *chunk_size*,
+    *querystring_key*, *default_number*, *paginator_class* and
+    *content_type*.
+
+    Usage::
+
+        def entries(request):
+            return stream_page(
+                request, Entry.objects.all(), 'entries/rows.html',
+                per_page=500, header_template='entries/header.html',
+                footer_template='entries/footer.html')
+    """
+    header_template = kwargs.get('header_template', None)
+    footer_template = kwargs.get('footer_template', None)
+    chunk_size = kwargs.get('chunk_size', 100)
+    content_type = kwargs.get('content_type', None)
+    data = utils.paginate_objects(
+        request, objects, per_page or settings.PER_PAGE,
+        paginator_class=kwargs.get('paginator_class', None),
+        default_number=kwargs.get('default_number', 1),
+        querystring_key=kwargs.get('querystring_key', None),
+    )
+    # Links only depend on the page number and the count, which are already
+    # known: they can be rendered before the objects are fetched.
+    context = dict(kwargs.get('context', None) or {})
+    context.update({
+        'endless': data,
+        'show_pages': mark_safe(str(models.get_page_list(request, data))),
+        'show_pageitems': str(models.ShowItems(
+            request, data['page'], data['querystring_key'],
+            default_number=data['default_number'])),
+    })
+    template = loader.get_template(template_name)
+
+    def render():
+        if header_template:
+            yield loader.render_to_string(header_template, context, request)
+        chunks = iter_chunks(data['page'].object_list, chunk_size)
+        for content in _render_chunks(template, context, request, chunks):
+            yield content
+        if footer_template:
+            yield loader.render_to_string(footer_template, context, request)
+
+    return StreamingHttpResponse(render(), content_type=content_type)
@@ -1,34 +1,144 @@
 """Django Endless Pagination template tags."""
 
-import re
+import functools
 
 from django import template
 from simple_pagination import settings
-from django.core.paginator import (
-    EmptyPage,
-    Paginator,
-)
+from django.db.models.query import QuerySet
 from simple_pagination import utils
 from simple_pagination import models
+from simple_pagination import paginators
+
+
+def _deleting(chars):
+    """Return a translation table deleting the underscore and *chars*."""
+    return dict.fromkeys(map(ord, '_' + chars))
+
+
+# Translation tables used to validate the *paginate* tag arguments.
+_WORD = _deleting('')
+_DOTTED = _deleting('.')
+_FIELDS = _deleting(' \t\n,')
+
+# The optional clauses of the *paginate* tag, in order: the words
+# introducing each clause, the name of the argument following them and the
+# table deleting the characters allowed in the argument, besides letters
+# and digits.
+PAGINATE_CLAUSES = (
+    (('containing',), 'containing', _DOTTED),
+    (('fields',), 'fields', _DOTTED),
+    (('starting', 'from', 'page'), 'number', _WORD),
+    (('using',), 'key', _deleting('"\'-')),
+    (('with',), 'override_path', _deleting('"\'/')),
+    (('as',), 'var_name', _WORD),
+)
+
+
+def _is_valid(value, table):
+    """Return True if *value* only has letters, digits and deleted chars."""
+    remaining = value.translate(table)
+    return bool(value) and (not remaining or remaining.isalnum())
+
+
+def _split_contents(contents):
+    """Split tag *contents* on whitespace, keeping quoted strings together."""
+    if '"' not in contents and "'" not in contents:
+        return contents.split()
+    bits = []
+    for piece in contents.split():
+        last = bits[-1] if bits else ''
+        if last[:1] in ('"', "'") and (len(last) == 1 or last[-1] != last[0]):
+            # The quoted string is not closed yet.
+            bits[-1] = last + ' ' + piece
+        else:
+            bits.append(piece)
+    return bits
+
+
+def _parse_objects_and_clauses(bits, position):
+    """Return the arguments from the objects at *position* to the end.
+
+    Return None if they are not valid.
+    """
+    size = len(bits)
+    if position >= size or not _is_valid(bits[position], _DOTTED):
+        return None
+    arguments = {'objects': bits[position]}
+    position += 1
+    for words, name, table in PAGINATE_CLAUSES:
+        end = position + len(words)
+        if end < size and bits[position] == words[0] and (
+                len(words) == 1 or tuple(bits[position:end]) == words):
+            value = bits[end]
+            if name == 'fields' and len(value) > 2 and (
+                    value[0] in ('"', "'") and value[-1] == value[0]):
+                valid = _is_valid(value[1:-1], _FIELDS)
+            elif name == 'number' and value[0] == '-':
+                valid = value[1:].isdigit()
+            else:
+                valid = _is_valid(value, table)
+            if not valid:
+                return None
+            arguments[name] = value
+            position = end + 1
+        else:
+            arguments[name] = None
+    if position != size:
+        return None
+    return arguments
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_paginate_arguments(contents):
+    """Return the arguments of the *paginate* tag whose contents are given.
+
+    The result is cached by *contents*, so that templates using the same
+    tag many times, or compiled many times, only parse it once. It must not
+    be modified. Raise a *TemplateSyntaxError* if the arguments are not
+    valid.
+    """
+    bits = _split_contents(contents)
+    tag_name = bits[0]
+    if len(bits) == 1:
+        msg = '%r tag requires arguments' % tag_name
+        raise template.TemplateSyntaxError(msg)
 
+    # The objects can be preceded by the number of items per page: like in
+    # ``{% paginate 20 fields %}``, the first argument is the number of items
+    # per page whenever the following ones are valid.
+    arguments = None
+    if len(bits) > 2:
+        first_page, comma, per_page = bits[1].rpartition(',')
+        if _is_valid(per_page, _WORD) and (
+                not comma or _is_valid(first_page, _WORD)):
+            arguments = _parse_objects_and_clauses(bits, 2)
+            if arguments is not None:
+                arguments['first_page'] = first_page if comma else None
+                arguments['per_page'] = per_page
+    if arguments is None:
+        arguments = _parse_objects_and_clauses(bits, 1)
+        if arguments is None:
+            msg = 'Invalid arguments for %r tag' % tag_name
+            raise template.TemplateSyntaxError(msg)
+        arguments['first_page'] = arguments['per_page'] = None
 
-PAGINATE_EXPRESSION = re.compile(r"""
-    ^   # Beginning of line.
-    (((?P<first_page>\w+)\,)?(?P<per_page>\w+)\s+)?  # First page, per page.
-    (?P<objects>[\.\w]+)  # Objects / queryset.
-    (\s+starting\s+from\s+page\s+(?P<number>[\-]?\d+|\w+))?  # Page start.
-    (\s+using\s+(?P<key>[\"\'\-\w]+))?  # Querystring key.
-    (\s+with\s+(?P<override_path>[\"\'\/\w]+))?  # Override path.
-    (\s+as\s+(?P<var_name>\w+))?  # Context variable name.
-    $   # End of line.
-""", re.VERBOSE)
-SHOW_CURRENT_NUMBER_EXPRESSION = re.compile(r"""
-    ^   # Beginning of line.
-    (starting\s+from\s+page\s+(?P<number>\w+))?\s*  # Page start.
-    (using\s+(?P<key>[\"\'\-\w]+))?\s*  # Querystring key.
-    (as\s+(?P<var_name>\w+))?  # Context variable name.
-    $   # End of line.
-""", re.VERBOSE)
+    # The variable name must be present if a nested context variable is passed.
+    objects = arguments['objects']
+    if '.' in objects and arguments['var_name'] is None:
+        msg = (
+            '%(tag)r tag requires a variable name `as` argumnent if the '
+            'queryset is provided as a nested context variable (%(objects)s). '
+            'You must either pass a direct queryset (e.g. taking advantage '
+            'of the `with` template tag) or provide a new variable name to '
+            'store the resulting queryset (e.g. `%(tag)s %(objects)s as '
+            'objects`).'
+        ) % {'tag': tag_name, 'objects': objects}
+        raise template.TemplateSyntaxError(msg)
+    return arguments
+
+
+# Render context key of the counts retrieved by *paginate_group*.
+PAGINATE_GROUP_COUNTS = 'simple_pagination_group_counts'
 
 
 register = template.Library()
@@ -90,6 +200,9 @@ def paginate(_, token, paginator_class=None):
 
         {% paginate entries starting from page -1 %}
 
+    Negative indexes require counting the objects, which is only done if
+    the request does not specify the page.
+
     This can be also achieved using a template variable that was passed to the
     context, e.g.:
 
@@ -99,6 +212,16 @@ def paginate(_, token, paginator_class=None):
 
     If the passed page number does not exist, the first page is displayed.
 
+    The default page can also be the one containing a given object of the
+    queryset, e.g. a comment linked by a permalink:
+
+    .. code-block:: html+django
+
+        {% paginate comments containing comment %}
+
+    The page number is computed counting the objects that precede it in the
+    queryset ordering.
+
     If you have multiple paginations in the same page, you can change the
     querydict key for the single pagination, e.g.:
 
@@ -143,41 +266,93 @@ def paginate(_, token, paginator_class=None):
 
     {% paginate 3,10 entries %}
 
-    You must use this tag before calling the {% show_more %} one.
-    """
-    # Validate arguments.
-    try:
-        tag_name, tag_args = token.contents.split(None, 1)
-    except ValueError:
-        msg = '%r tag requires arguments' % token.contents.split()[0]
-        raise template.TemplateSyntaxError(msg)
+    To only retrieve some fields of the objects, e.g. when the template
+    just displays a few columns, you can provide them (or a context variable
+    containing them) with the *fields* argument:
 
-    # Use a regexp to catch args.
-    match = PAGINATE_EXPRESSION.match(tag_args)
-    if match is None:
-        msg = 'Invalid arguments for %r tag' % tag_name
-        raise template.TemplateSyntaxError(msg)
+    .. code-block:: html+django
+
+        {% paginate entries fields "id,title,created" %}
+
+    The objects of the page are then named tuples (or, when using a custom
+    paginator, model instances with only those fields loaded).
 
-    # Retrieve objects.
-    kwargs = match.groupdict()
+    You must use this tag before calling the {% show_more %} one.
+    """
+    # Parse the arguments: the result is shared, hence copied.
+    kwargs = dict(parse_paginate_arguments(token.contents))
     objects = kwargs.pop('objects')
 
-    # The variable name must be present if a nested context variable is passed.
-    if '.' in objects and kwargs['var_name'] is None:
-        msg = (
-            '%(tag)r tag requires a variable name `as` argumnent if the '
-            'queryset is provided as a nested context variable (%(objects)s). '
-            'You must either pass a direct queryset (e.g. taking advantage '
-            'of the `with` template tag) or provide a new variable name to '
-            'store the resulting queryset (e.g. `%(tag)s %(objects)s as '
-            'objects`).'
-        ) % {'tag': tag_name, 'objects': objects}
+    # Keyset pages are identified by cursors, not by numbers.
+    if (kwargs['containing'] is not None and paginator_class is not None and
+            issubclass(paginator_class, paginators.KeysetPaginator)):
+        msg = '%r tag does not accept the `containing` argument' % (
+            token.contents.split()[0])
         raise template.TemplateSyntaxError(msg)
 
     # Call the node.
     return PaginateNode(paginator_class, objects, **kwargs)
 
 
+@register.tag
+def keyset_paginate(parser, token):
+    """Paginate objects seeking rows by the values of their ordering.
+
+    Usage:
+
+    .. code-block:: html+django
+
+        {% keyset_paginate entries %}
+
+    This tag accepts the same arguments as the *paginate* one. The queryset
+    must be ordered by model fields, and the pages are identified by signed
+    cursors instead of page numbers: each page, including the previous and
+    the last ones, is retrieved without OFFSET and without counting the
+    objects. A negative default page (e.g. ``starting from page -1``) means
+    the last page.
+    """
+    return paginate(
+        parser, token, paginator_class=paginators.KeysetPaginator)
+
+
+@register.tag
+def snapshot_paginate(parser, token):
+    """Paginate objects using a cached snapshot of their primary keys.
+
+    Usage:
+
+    .. code-block:: html+django
+
+        {% snapshot_paginate entries %}
+
+    This tag accepts the same arguments as the *paginate* one. The ordered
+    primary keys of the queryset are stored in the cache the first time,
+    and the other pages are retrieved by primary key: this is useful when
+    filtering and ordering the queryset is expensive. Page links carry the
+    snapshot token in the querystring.
+    """
+    return paginate(
+        parser, token, paginator_class=paginators.SnapshotPaginator)
+
+
+@register.tag
+def window_paginate(parser, token):
+    """Paginate objects counting them in the same query of the page.
+
+    Usage:
+
+    .. code-block:: html+django
+
+        {% window_paginate entries %}
+
+    This tag accepts the same arguments as the *paginate* one. The page
+    objects are retrieved along with a ``COUNT(*) OVER ()`` window, so that
+    a single query returns both the page and the total number of objects.
+    """
+    return paginate(
+        parser, token, paginator_class=paginators.WindowCountPaginator)
+
+
 class PaginateNode(template.Node):
     """Add to context the objects of the current page.
 
@@ -191,17 +366,22 @@ class PaginateNode(template.Node):
         number = kwargs.get('number', None)
         key = kwargs.get('key', None)
         override_path = kwargs.get('override_path', None)
-        self.paginator = paginator_class or Paginator
+        containing = kwargs.get('containing', None)
+        fields = kwargs.get('fields', None)
+        self.paginator = paginator_class
         self.objects = template.Variable(objects)
+        self.containing_variable = None
+        if containing is not None:
+            self.containing_variable = template.Variable(containing)
 
         # If *var_name* is not passed, then the queryset name will be used.
         self.var_name = objects if var_name is None else var_name
 
         # If *per_page* is not passed then the default value from settings
-        # will be used.
+        # will be used at render time.
         self.per_page_variable = None
         if per_page is None:
-            self.per_page = settings.PER_PAGE
+            self.per_page = None
         elif per_page.isdigit():
             self.per_page = int(per_page)
         else:
@@ -229,12 +409,21 @@ class PaginateNode(template.Node):
         # Set the querystring key attribute.
         self.querystring_key_variable = None
         if key is None:
-            self.querystring_key = settings.PAGE_LABEL
+            self.querystring_key = None
         elif key[0] in ('"', "'") and key[-1] == key[0]:
             self.querystring_key = key[1:-1]
         else:
             self.querystring_key_variable = template.Variable(key)
 
+        # Handle the projected *fields*.
+        self.fields_variable = None
+        if fields is None:
+            self.fields = None
+        elif fields[0] in ('"', "'") and fields[-1] == fields[0]:
+            self.fields = utils.split_fields(fields[1:-1])
+        else:
+            self.fields_variable = template.Variable(fields)
+
         # Handle *override_path*.
         self.override_path_variable = None
         if override_path is None:
@@ -255,14 +444,14 @@ class PaginateNode(template.Node):
 
         # Calculate the number of items to show on each page.
         if self.per_page_variable is None:
-            per_page = self.per_page
+            per_page = self.per_page or settings.PER_PAGE
         else:
             per_page = int(self.per_page_variable.resolve(context))
 
         # User can override the querystring key to use in the template.
         # The default value is defined in the settings file.
         if self.querystring_key_variable is None:
-            querystring_key = self.querystring_key
+            querystring_key = self.querystring_key or settings.PAGE_LABEL
         else:
             querystring_key = self.querystring_key_variable.resolve(context)
 
@@ -272,37 +461,105 @@ class PaginateNode(template.Node):
         else:
             override_path = self.override_path_variable.resolve(context)
 
-        # Retrieve the queryset and create the paginator object.
-        objects = self.objects.resolve(context)
-        paginator = self.paginator(
-            objects, per_page)
-
-        # Normalize the default page number if a negative one is provided.
-        if default_number < 0:
-            default_number = utils.normalize_page_number(
-                default_number, paginator.page_range)
+        # Retrieve the fields to select, if any.
+        if self.fields_variable is None:
+            fields = self.fields
+        else:
+            fields = utils.split_fields(self.fields_variable.resolve(context))
 
-        # The current request is used to get the requested page number.
-        page_number = utils.get_page_number_from_request(
-            context['request'], querystring_key, default=default_number)
+        # Retrieve the queryset.
+        objects = self.objects.resolve(context)
 
-        # Get the page.
-        try:
-            page = paginator.page(page_number)
-        except EmptyPage:
-            page = paginator.page(1)
+        # Reuse the count retrieved by an enclosing *paginate_group*, unless
+        # the variable has been rebound in the block (e.g. by a *with* or
+        # *for* tag). Nested variables (e.g. ``entries.all``) return a new
+        # queryset each time they are resolved: the queries are compared.
+        count = None
+        counts = context.render_context.get(PAGINATE_GROUP_COUNTS, {})
+        if self in counts and utils.is_same_query(objects, counts[self][0]):
+            count = counts[self][1]
+
+        # The default page can be the one containing a given object.
+        containing = None
+        if self.containing_variable is not None:
+            containing = self.containing_variable.resolve(context)
+
+        # Paginate.
+        data = utils.paginate_objects(
+            context['request'], objects, per_page,
+            paginator_class=self.paginator,
+            count=count,
+            default_number=default_number,
+            containing=containing,
+            querystring_key=querystring_key,
+            override_path=override_path,
+            fields=fields,
+        )
 
         # Populate the context with required data.
-        data = {
-            'default_number': default_number,
-            'override_path': override_path,
-            'page': page,
-            'querystring_key': querystring_key,
-        }
-        context.update({'endless': data, self.var_name: page.object_list})
+        context.update({'endless': data, self.var_name: data['page'].object_list})
         return ''
 
 
+@register.tag
+def paginate_group(parser, token):
+    """Group several paginations in the same page.
+
+    Usage:
+
+    .. code-block:: html+django
+
+        {% paginate_group %}
+            {% paginate entries using 'entries_page' %}
+            ...
+            {% paginate comments using 'comments_page' %}
+            ...
+        {% endpaginate_group %}
+
+    The counts of all the querysets paginated inside the block are
+    retrieved in a single database query, when they share the same
+    database.
+    """
+    # Validate args.
+    if len(token.contents.split()) != 1:
+        msg = '%r tag takes no arguments' % token.contents.split()[0]
+        raise template.TemplateSyntaxError(msg)
+    nodelist = parser.parse(('endpaginate_group',))
+    parser.delete_first_token()
+    # Call the node.
+    return PaginateGroupNode(nodelist)
+
+
+class PaginateGroupNode(template.Node):
+    """Retrieve the counts of the grouped paginations at once."""
+
+    def __init__(self, nodelist):
+        self.nodelist = nodelist
+
+    def render(self, context):
+        nodes, querysets = [], []
+        for node in self.nodelist.get_nodes_by_type(PaginateNode):
+            try:
+                objects = node.objects.resolve(context)
+            except template.VariableDoesNotExist:
+                continue
+            # Keyset pages are never counted.
+            paginator_class = (
+                node.paginator or paginators.get_paginator_class(objects))
+            if (isinstance(objects, QuerySet) and
+                    not issubclass(paginator_class, paginators.KeysetPaginator)):
+                nodes.append(node)
+                querysets.append(objects)
+        counts = utils.get_counts(querysets) if querysets else []
+        context.render_context[PAGINATE_GROUP_COUNTS] = dict(
+            (node, (objects, count))
+            for node, objects, count in zip(nodes, querysets, counts))
+        try:
+            return self.nodelist.render(context)
+        finally:
+            del context.render_context[PAGINATE_GROUP_COUNTS]
+
+
 @register.tag
 def show_pages(_, token):
     """Show page links.
@@ -345,13 +602,7 @@ class ShowPagesNode(template.Node):
         # *paginate* or *lazy_paginate* before including the getpages template.
         data = utils.get_data_from_context(context)
         # Return the string representation of the sequence of pages.
-        pages = models.PageList(
-            context['request'],
-            data['page'],
-            data['querystring_key'],
-            default_number=data['default_number'],
-            override_path=data['override_path'],
-        )
+        pages = models.get_page_list(context['request'], data)
         return str(pages)
 
 
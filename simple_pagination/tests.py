@@ -1,14 +1,69 @@
-from django.test import TestCase
-from django.template import Template, Context
-from django.http import HttpRequest
+import asyncio
+import datetime
+import decimal
+import os
+import re
+import shutil
+import tempfile
+import types
+import unittest
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.paginator import Paginator
+from django.db.models.functions import Length
+from django.http import HttpRequest, HttpResponse, QueryDict
+from django.template import Context, Template, TemplateSyntaxError
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import resolve
+from django.urls.converters import get_converters
+
+from simple_pagination import settings
+from simple_pagination.cursor import InvalidCursor, decode_cursor, encode_cursor
+from simple_pagination.decorators import condition_on_page
+from simple_pagination.export import export_pages
+from simple_pagination.middleware import PaginationLinkMiddleware, TenantMiddleware
+from simple_pagination.models import EndlessPage, PageList, ShowItems
+from simple_pagination.paginators import (
+    KeysetPaginator,
+    Shards,
+    SnapshotPaginator,
+    WindowCountPaginator,
+    get_page_number_for_object,
+)
+from simple_pagination.paths import PAGE_CONVERTER, PageConverter, page_path
+from simple_pagination.streaming import stream_page
+from simple_pagination.templatetags.paginate import parse_paginate_arguments
 from simple_pagination.utils import(
     normalize_page_number,
     get_querystring_for_page,
     get_page_numbers,
+    get_cursor_from_request,
+    paginate_objects,
+    path_cache_clear,
+    path_cache_info,
 )
-from simple_pagination.models import EndlessPage, PageList, ShowItems
-from django.http import QueryDict
-from django.core.paginator import Paginator
+
+try:
+    import jinja2
+except ImportError:
+    jinja2 = None
+
+try:
+    from rest_framework.request import Request
+    from simple_pagination import drf
+except ImportError:
+    drf = None
+
+
+class UsersTestCase(TestCase):
+    """A test case with 25 users, named from user00 to user24."""
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.bulk_create(
+            User(username='user%02d' % i) for i in range(25))
 
 
 class PaginateAndShowPageItems(TestCase):
@@ -96,3 +151,959 @@ class TestPageList(TestCase):
         self.assertTrue(page_list)
         si = ShowItems(request=request, page=page, querystring_key="page")
         self.assertTrue(si)
+
+
+class ConditionOnPage(UsersTestCase):
+
+    def setUp(self):
+        self.queryset = User.objects.order_by('pk')
+
+    def test_not_modified(self):
+        calls = []
+
+        @condition_on_page(
+            self.queryset, per_page=10, updated_field='date_joined')
+        def view(request):
+            calls.append(request)
+            return HttpResponse('page')
+
+        factory = RequestFactory()
+        response = view(factory.get('/', {'page': 2}))
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        response = view(factory.get(
+            '/', {'page': 2}, HTTP_IF_NONE_MATCH=etag))
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(calls), 1)
+        response = view(factory.get(
+            '/', {'page': 3}, HTTP_IF_NONE_MATCH=etag))
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(TEMPLATES=[{
+    'BACKEND': 'django.template.backends.django.DjangoTemplates',
+    'OPTIONS': {'loaders': [('django.template.loaders.locmem.Loader', {
+        'page.html': '{{ show_pages }}',
+    }), 'django.template.loaders.app_directories.Loader']},
+}])
+class ExportPages(UsersTestCase):
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir)
+
+    def test_export_pages(self):
+        with self.assertNumQueries(2):
+            filenames = export_pages(
+                User.objects.order_by('pk'), 'page.html', self.output_dir,
+                per_page=10)
+        self.assertEqual(len(filenames), 3)
+        self.assertEqual(
+            sorted(os.listdir(self.output_dir)),
+            ['page-1.html', 'page-2.html', 'page-3.html'])
+        with open(os.path.join(self.output_dir, 'page-2.html')) as page:
+            content = page.read()
+        self.assertEqual(
+            sorted(set(re.findall(r'href="([^"]*)"', content))),
+            ['page-1.html', 'page-3.html'])
+
+    def test_export_pages_directories(self):
+        export_pages(
+            User.objects.order_by('pk'), 'page.html', self.output_dir,
+            per_page=10, filename_format='{number}/index.html')
+        with open(os.path.join(self.output_dir, '3', 'index.html')) as page:
+            content = page.read()
+        self.assertEqual(
+            sorted(set(re.findall(r'href="([^"]*)"', content))),
+            ['../1/index.html', '../2/index.html'])
+
+
+class PageListLinks(TestCase):
+
+    def test_links(self):
+        request = RequestFactory().get('/entries/', {'q': 'django'})
+        paginator = Paginator(range(100), 10)
+        page_list = PageList(request, paginator.page(3), 'page')
+        links = page_list.links()
+        self.assertEqual(len(links), 10)
+        self.assertEqual(links[0], ('1', '/entries/?q=django', False))
+        self.assertEqual(links[2], ('3', '/entries/?q=django&page=3', True))
+        for label, href, is_current in links:
+            self.assertEqual(href, page_list[label].path)
+        self.assertEqual(
+            page_list.links([4]), [('4', '/entries/?q=django&page=4', False)])
+
+    @override_settings(
+        SIMPLE_PAGINATION_LOCALIZE_PAGE_NUMBERS=True,
+        USE_THOUSAND_SEPARATOR=True, LANGUAGE_CODE='en')
+    def test_localized_links(self):
+        request = RequestFactory().get('/entries/')
+        paginator = Paginator(range(20000), 10)
+        page_list = PageList(request, paginator.page(1234), 'page')
+        self.assertEqual(
+            page_list.links([1234, 1235]),
+            [('1,234', '/entries/?page=1234', True),
+             ('1,235', '/entries/?page=1235', False)])
+        self.assertEqual(page_list[1234].label, '1,234')
+
+
+@unittest.skipIf(jinja2 is None, 'Jinja2 is not installed')
+class JinjaExtension(TestCase):
+
+    def test_paginate(self):
+        env = jinja2.Environment(
+            autoescape=True,
+            extensions=['simple_pagination.jinja2ext.PaginationExtension'])
+        t = env.from_string(
+            "{% set endless = paginate(entities, 20) %}"
+            "{{ endless.page.object_list|join(',') }}|"
+            "{{ show_pageitems(endless) }}|{{ show_pages(endless) }}")
+        request = RequestFactory().get('/', {'page': 2})
+        val = t.render(entities=range(100), request=request)
+        self.assertIn(','.join(map(str, range(20, 40))), val)
+        self.assertIn('Showing 21 to 40 of 100 items', val)
+        self.assertIn('<a class="page-link" href="/?page=3" rel="page">3</a>', val)
+        self.assertIn('<a class="page-link active">2</a>', val)
+
+
+class ShowItemsRange(UsersTestCase):
+
+    def test_show_items(self):
+        request = RequestFactory().get('/')
+        paginator = Paginator(User.objects.order_by('pk'), 10)
+        self.assertEqual(paginator.count, 25)
+        for number, text in [(1, 'Showing 1 to 10 of 25 items'),
+                             (2, 'Showing 11 to 20 of 25 items'),
+                             (3, 'Showing 21 to 25 of 25 items')]:
+            page = paginator.page(number)
+            with self.assertNumQueries(0):
+                self.assertEqual(str(ShowItems(request, page, 'page')), text)
+
+    def test_show_items_format(self):
+        request = RequestFactory().get('/')
+        page = Paginator(range(12345), 10).page(2)
+        with self.settings(
+                USE_THOUSAND_SEPARATOR=True,
+                SIMPLE_PAGINATION_SHOW_ITEMS_FORMAT='{start}-{end}/{total}'):
+            self.assertEqual(
+                str(ShowItems(request, page, 'page')), '11-20/12,345')
+
+
+class PaginateGroup(UsersTestCase):
+
+    def test_paginate_group(self):
+        t = Template(
+            "{% load paginate %}{% paginate_group %}"
+            "{% paginate 10 users using 'users_page' %}{% show_pageitems %}|"
+            "{% paginate 5 staff using 'staff_page' %}{% show_pageitems %}"
+            "{% endpaginate_group %}")
+        request = RequestFactory().get('/', {'users_page': 3})
+        c = Context({
+            'users': User.objects.order_by('pk'),
+            'staff': User.objects.filter(
+                username__startswith='user1').order_by('pk'),
+            'request': request,
+        })
+        with self.assertNumQueries(1):
+            val = t.render(c)
+        self.assertEqual(
+            val, 'Showing 21 to 25 of 25 items|Showing 1 to 5 of 10 items')
+
+    def test_paginate_group_nested_variables(self):
+        t = Template(
+            "{% load paginate %}{% paginate_group %}"
+            "{% paginate 10 users.all using 'users_page' as users_list %}"
+            "{% show_pageitems %}|"
+            "{% paginate 5 staff.all using 'staff_page' as staff_list %}"
+            "{% show_pageitems %}|"
+            "{% keyset_paginate 5 users using 'keyset_page' %}"
+            "{{ users|length }}"
+            "{% endpaginate_group %}")
+        c = Context({
+            'users': User.objects.order_by('pk'),
+            'staff': User.objects.filter(username__startswith='user1'),
+            'request': RequestFactory().get('/', {'users_page': 3}),
+        })
+        # The grouped count and the keyset page, which is not counted.
+        with self.assertNumQueries(2):
+            val = t.render(c)
+        self.assertEqual(
+            val,
+            'Showing 21 to 25 of 25 items|Showing 1 to 5 of 10 items|5')
+
+    def test_paginate_group_rebound_variables(self):
+        t = Template(
+            "{% load paginate %}{% paginate_group %}"
+            "{% with users=staff %}{% paginate 5 users %}"
+            "{% show_pageitems %}{% endwith %}|"
+            "{% for users in groups %}{% paginate 5 users using 'p' %}"
+            "{% show_pageitems %}{% endfor %}"
+            "{% endpaginate_group %}")
+        c = Context({
+            'users': User.objects.order_by('pk'),
+            'staff': User.objects.filter(username__startswith='user1'),
+            'groups': [User.objects.filter(username__startswith='user2')],
+            'request': RequestFactory().get('/'),
+        })
+        self.assertEqual(
+            t.render(c),
+            'Showing 1 to 5 of 10 items|Showing 1 to 5 of 5 items')
+
+    def test_paginate_group_sliced(self):
+        t = Template(
+            "{% load paginate %}{% paginate_group %}"
+            "{% paginate 5 users %}{% show_pageitems %}|"
+            "{% paginate 5 staff using 'staff_page' %}{% show_pageitems %}"
+            "{% endpaginate_group %}")
+        c = Context({
+            'users': User.objects.order_by('pk')[:12],
+            'staff': User.objects.filter(username__startswith='user1'),
+            'request': RequestFactory().get('/'),
+        })
+        with self.assertNumQueries(2):
+            val = t.render(c)
+        self.assertEqual(
+            val, 'Showing 1 to 5 of 12 items|Showing 1 to 5 of 10 items')
+
+
+class CursorCodec(TestCase):
+
+    def test_round_trip(self):
+        values = (
+            42, -1, 'caf\xe9', None, True, uuid.uuid4(),
+            datetime.datetime(2020, 5, 17, 10, 30, 0, 123),
+            datetime.datetime(2020, 5, 17, 10, 30, tzinfo=datetime.timezone.utc),
+        )
+        token = encode_cursor(values)
+        self.assertNotIn('=', token)
+        self.assertEqual(decode_cursor(token), values)
+
+    def test_dates_and_numbers(self):
+        values = (
+            datetime.date(2020, 5, 17), decimal.Decimal('-12.50'),
+            2 ** 70, -2 ** 63,
+        )
+        decoded = decode_cursor(encode_cursor(values))
+        self.assertEqual(decoded, values)
+        self.assertEqual(
+            [type(value) for value in decoded],
+            [datetime.date, decimal.Decimal, int, int])
+
+    def test_invalid(self):
+        token = encode_cursor((1, 'abc'))
+        for invalid in (token[:-2], token[:-1] + 'A', '!!', ''):
+            with self.assertRaises(InvalidCursor):
+                decode_cursor(invalid)
+        with self.assertRaises(TypeError):
+            encode_cursor((1.5,))
+
+    def test_get_cursor_from_request(self):
+        token = encode_cursor((3, 'abc'))
+        request = RequestFactory().get('/', {'page': token})
+        self.assertEqual(get_cursor_from_request(request), (3, 'abc'))
+        request = RequestFactory().get('/', {'page': 'tampered'})
+        self.assertIsNone(get_cursor_from_request(request))
+
+
+class KeysetPagination(UsersTestCase):
+
+    def setUp(self):
+        self.paginator = KeysetPaginator(
+            User.objects.order_by('-username'), 10)
+
+    def usernames(self, page):
+        return [user.username for user in page.object_list]
+
+    def test_values(self):
+        for queryset in (User.objects.values(),
+                         User.objects.values_list('username')):
+            with self.assertRaises(ValueError):
+                KeysetPaginator(queryset.order_by('username'), 10)
+
+    def test_navigation(self):
+        page = self.paginator.page()
+        self.assertEqual(self.usernames(page)[0], 'user24')
+        self.assertFalse(page.has_previous())
+        with self.assertNumQueries(1):
+            page = self.paginator.page(
+                decode_cursor(page.next_page_number()))
+        self.assertEqual(
+            self.usernames(page), ['user%02d' % i for i in range(14, 4, -1)])
+        last = self.paginator.page(decode_cursor(page.next_page_number()))
+        self.assertEqual(
+            self.usernames(last), ['user%02d' % i for i in range(4, -1, -1)])
+        self.assertFalse(last.has_next())
+        previous = self.paginator.page(
+            decode_cursor(last.previous_page_number()))
+        self.assertEqual(self.usernames(previous), self.usernames(page))
+        with self.assertNumQueries(1):
+            last = self.paginator.page(decode_cursor(
+                self.paginator.last_cursor))
+        self.assertEqual(
+            self.usernames(last), ['user%02d' % i for i in range(9, -1, -1)])
+        self.assertTrue(last.has_previous())
+        self.assertFalse(last.has_next())
+
+    def test_keyset_paginate(self):
+        t = Template(
+            "{% load paginate %}{% keyset_paginate 10 users %}"
+            "{{ users|length }}{% show_pages %}")
+        page = self.paginator.page()
+        request = RequestFactory().get('/', {'page': page.next_page_number()})
+        c = Context({'users': User.objects.order_by('-username'), 'request': request})
+        with self.assertNumQueries(1):
+            val = t.render(c)
+        self.assertTrue(val.startswith('10'))
+        self.assertIn('href="/"', val)
+        self.assertIn('href="/?page=' + self.paginator.last_cursor, val)
+
+    def test_keyset_show_pageitems(self):
+        t = Template(
+            "{% load paginate %}{% keyset_paginate 10 users %}"
+            "{{ users|length }}{% show_pageitems %}")
+        c = Context({
+            'users': User.objects.order_by('-username'),
+            'request': RequestFactory().get('/'),
+        })
+        self.assertEqual(t.render(c), '10')
+        response = stream_page(
+            RequestFactory().get('/'), User.objects.order_by('-username'),
+            'simple/show_pages.html', per_page=10,
+            paginator_class=KeysetPaginator)
+        self.assertTrue(b''.join(response.streaming_content))
+
+    def test_keyset_paginate_last(self):
+        t = Template(
+            "{% load paginate %}"
+            "{% keyset_paginate 10 users starting from page -1 %}"
+            "{{ users.0.username }}{% show_pages %}")
+        c = Context({
+            'users': User.objects.order_by('-username'),
+            'request': RequestFactory().get('/'),
+        })
+        with self.assertNumQueries(1):
+            val = t.render(c)
+        self.assertTrue(val.startswith('user09'))
+        self.assertIn('href="/?page=' + self.paginator.first_cursor, val)
+        self.assertNotIn(self.paginator.last_cursor, val)
+
+
+class PageContainingObject(UsersTestCase):
+
+    def setUp(self):
+        self.queryset = User.objects.order_by('-username')
+
+    def test_get_page_number_for_object(self):
+        user = User.objects.get(username='user14')
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                get_page_number_for_object(self.queryset, user, 10), 2)
+        user = User.objects.get(username='user15')
+        self.assertEqual(get_page_number_for_object(self.queryset, user, 10), 1)
+
+    def test_paginate_containing(self):
+        t = Template(
+            "{% load paginate %}{% paginate 10 users containing user %}"
+            "{% show_pageitems %}")
+        c = Context({
+            'users': self.queryset,
+            'user': User.objects.get(username='user03'),
+            'request': RequestFactory().get('/'),
+        })
+        self.assertEqual(t.render(c), 'Showing 21 to 25 of 25 items')
+
+    @override_settings(SIMPLE_PAGINATION_PER_PAGE_MAX=50)
+    def test_paginate_containing_per_page(self):
+        t = Template(
+            "{% load paginate %}{% paginate 10 users containing user %}"
+            "{% for user in users %}{{ user.username }} {% endfor %}")
+        c = Context({
+            'users': self.queryset,
+            'user': User.objects.get(username='user03'),
+            'request': RequestFactory().get('/', {'per_page': 2}),
+        })
+        self.assertEqual(t.render(c), 'user04 user03 ')
+
+    def test_paginate_containing_sequence(self):
+        t = Template(
+            "{% load paginate %}{% paginate 10 entities containing entity %}"
+            "{% show_pageitems %}")
+        for entity, expected in ((23, 'Showing 21 to 25 of 25 items'),
+                                 (99, 'Showing 1 to 10 of 25 items')):
+            c = Context({
+                'entities': list(range(25)),
+                'entity': entity,
+                'request': RequestFactory().get('/'),
+            })
+            self.assertEqual(t.render(c), expected)
+        rows = User.objects.raw('SELECT * FROM auth_user')
+        with self.assertRaises(TypeError):
+            get_page_number_for_object(rows, self.queryset[0], 10)
+
+    def test_keyset_containing(self):
+        with self.assertRaises(TemplateSyntaxError):
+            Template(
+                "{% load paginate %}"
+                "{% keyset_paginate 10 users containing user %}")
+        with self.assertRaises(ValueError):
+            paginate_objects(
+                RequestFactory().get('/'), self.queryset, 10,
+                paginator_class=KeysetPaginator, containing=self.queryset[0])
+
+
+class SnapshotPagination(UsersTestCase):
+
+    def setUp(self):
+        self.template = Template(
+            "{% load paginate %}{% snapshot_paginate 10 users %}"
+            "{% for user in users %}{{ user.username }} {% endfor %}"
+            "{% show_pages %}")
+
+    def render(self, **data):
+        return self.template.render(Context({
+            'users': User.objects.order_by('-username'),
+            'request': RequestFactory().get('/', data),
+        }))
+
+    def test_snapshot(self):
+        val = self.render()
+        self.assertIn('user24 user23', val)
+        token = re.search(r'snapshot=(\w+)', val).group(1)
+        User.objects.create(username='user99')
+        with self.assertNumQueries(1):
+            val = self.render(page=3, snapshot=token)
+        self.assertIn('user04 user03 user02 user01 user00', val)
+        self.assertIn('snapshot=' + token, val)
+        val = self.render(page=1, snapshot='unknown')
+        self.assertIn('user99 user24', val)
+
+    @override_settings(SIMPLE_PAGINATION_SNAPSHOT_MAX_SIZE=5)
+    def test_too_large(self):
+        caches['default'].clear()
+        with self.assertNumQueries(3):
+            val = self.render(page=2)
+        self.assertNotIn('snapshot=', val)
+        # The primary keys are not scanned again: only count and page.
+        with self.assertNumQueries(2):
+            val = self.render(page=3)
+        self.assertIn('user04 user03 user02 user01 user00', val)
+
+    def test_empty(self):
+        val = self.template.render(Context({
+            'users': User.objects.none(),
+            'request': RequestFactory().get('/'),
+        }))
+        self.assertEqual(val, '')
+
+    def test_sequence(self):
+        t = Template(
+            "{% load paginate %}{% snapshot_paginate 10 entities %}"
+            "{{ entities|join:',' }} {% show_pageitems %}")
+        val = t.render(Context({
+            'entities': range(25),
+            'request': RequestFactory().get('/', {'page': 3}),
+        }))
+        self.assertEqual(val, '20,21,22,23,24 Showing 21 to 25 of 25 items')
+
+    def test_filters_not_run_again(self):
+        users = User.objects.filter(username__gt='user04').order_by('-pk')
+        paginator = SnapshotPaginator(users.select_related(), 10)
+        self.assertTrue(paginator.create_snapshot())
+        objects = paginator._get_objects([1, 2])
+        self.assertNotIn('user04', str(objects.query))
+        self.assertEqual(objects.query.select_related, True)
+        # Annotations depend on the query: the filters are run again.
+        paginator = SnapshotPaginator(
+            users.annotate(name_length=Length('username')), 10)
+        self.assertIn('user04', str(paginator._get_objects([1, 2]).query))
+
+    def test_lazy_object_list(self):
+        token = re.search(r'snapshot=(\w+)', self.render()).group(1)
+        t = Template(
+            "{% load paginate %}{% snapshot_paginate 10 users %}"
+            "{% if show %}{% for user in users %}{{ user.username }} "
+            "{% endfor %}{% endif %}{% show_pageitems %}")
+        request = RequestFactory().get('/', {'page': 2, 'snapshot': token})
+        c = Context({
+            'users': User.objects.order_by('-username'),
+            'request': request,
+            'show': False,
+        })
+        with self.assertNumQueries(0):
+            val = t.render(c)
+        self.assertEqual(val, 'Showing 11 to 20 of 25 items')
+
+
+class ShardedPagination(UsersTestCase):
+
+    def test_paginate_shards(self):
+        t = Template(
+            "{% load paginate %}{% paginate 10 users %}"
+            "{% for user in users %}{{ user.username }} {% endfor %}"
+            "{% show_pageitems %}")
+        users = User.objects.order_by('-username')
+        c = Context({
+            'users': Shards(
+                users.filter(id__in=range(0, 100, 2)),
+                users.exclude(id__in=range(0, 100, 2))),
+            'request': RequestFactory().get('/', {'page': 2}),
+        })
+        val = t.render(c)
+        self.assertEqual(val, ''.join(
+            'user%02d ' % i for i in range(14, 4, -1)
+        ) + 'Showing 11 to 20 of 25 items')
+
+
+class RawQueryPagination(UsersTestCase):
+
+    def setUp(self):
+        self.template = Template(
+            "{% load paginate %}{% paginate 10 rows %}"
+            "{% for row in rows %}{{ row.username }} {% endfor %}"
+            "{% show_pageitems %}")
+
+    def render(self, page):
+        rows = User.objects.raw(
+            'SELECT id, username FROM auth_user WHERE username > %s '
+            'ORDER BY username', ['user01'])
+        return self.template.render(Context({
+            'rows': rows,
+            'request': RequestFactory().get('/', {'page': page}),
+        }))
+
+    def test_paginate_raw(self):
+        with self.assertNumQueries(2):
+            val = self.render(1)
+        self.assertTrue(val.startswith('user02 user03'))
+        self.assertTrue(val.endswith('Showing 1 to 10 of 23 items'))
+        with self.assertNumQueries(1):
+            val = self.render(3)
+        self.assertEqual(
+            val, 'user22 user23 user24 Showing 21 to 23 of 23 items')
+
+    def test_model_instances(self):
+        t = Template(
+            "{% load paginate %}{% paginate 2 rows %}"
+            "{% for row in rows %}{{ row.get_username }}:{{ row.pk }} "
+            "{% endfor %}")
+        rows = User.objects.raw(
+            'SELECT * FROM auth_user WHERE id > %(id)s ORDER BY id',
+            {'id': User.objects.get(username='user21').pk})
+        val = t.render(Context({
+            'rows': rows, 'request': RequestFactory().get('/', {'page': 2}),
+        }))
+        self.assertEqual(val, 'user24:{0} '.format(
+            User.objects.get(username='user24').pk))
+
+
+class PaginateFields(UsersTestCase):
+
+    def test_paginate_fields(self):
+        t = Template(
+            "{% load paginate %}"
+            "{% paginate 10 users fields 'id, username' as page_users %}"
+            "{% for user in page_users %}{{ user.username }} {% endfor %}")
+        c = Context({
+            'users': User.objects.order_by('username'),
+            'request': RequestFactory().get('/', {'page': 3}),
+        })
+        val = t.render(c)
+        self.assertEqual(val, 'user20 user21 user22 user23 user24 ')
+        self.assertEqual(c['page_users'][0]._fields, ('id', 'username'))
+
+
+class PerPageNegotiation(TestCase):
+
+    def render(self, **data):
+        t = Template(
+            "{% load paginate %}{% paginate entities %}"
+            "{% show_pageitems %}|{{ endless.per_page }}|{% show_pages %}")
+        return t.render(Context({
+            'entities': range(100),
+            'request': RequestFactory().get('/', data),
+        }))
+
+    def test_disabled(self):
+        val = self.render(per_page=50)
+        self.assertTrue(val.startswith('Showing 1 to 10 of 100 items|10|'))
+
+    @override_settings(SIMPLE_PAGINATION_PER_PAGE_MAX=20)
+    def test_maximum(self):
+        val = self.render(per_page=100000)
+        self.assertTrue(val.startswith('Showing 1 to 20 of 100 items|20|'))
+        self.assertIn('href="/?per_page=20&amp;page=2"', val)
+
+    @override_settings(SIMPLE_PAGINATION_PER_PAGE_ALLOWED=(10, 25))
+    def test_allowed(self):
+        val = self.render(per_page=25)
+        self.assertTrue(val.startswith('Showing 1 to 25 of 100 items|25|'))
+        val = self.render(per_page=30)
+        self.assertTrue(val.startswith('Showing 1 to 10 of 100 items|10|'))
+
+
+class PaginationLinkHeaders(UsersTestCase):
+
+    def get_response(self, template, request):
+        def view(request):
+            return HttpResponse(Template(template).render(Context({
+                'entities': range(100),
+                'users': User.objects.order_by('username'),
+                'request': request,
+            })))
+        return PaginationLinkMiddleware(view)(request)
+
+    def test_link_headers(self):
+        request = RequestFactory().get('/entities/', {'page': 2, 'q': 'a'})
+        response = self.get_response(
+            "{% load paginate %}{% paginate entities %}", request)
+        self.assertEqual(response['Link'], ', '.join([
+            '<http://testserver/entities/?q=a>; rel="first"',
+            '<http://testserver/entities/?q=a>; rel="prev"',
+            '<http://testserver/entities/?q=a&page=3>; rel="next"',
+            '<http://testserver/entities/?q=a&page=10>; rel="last"',
+        ]))
+        self.assertEqual(response['X-Total-Count'], '100')
+
+    def test_keyset_headers(self):
+        response = self.get_response(
+            "{% load paginate %}{% keyset_paginate users %}",
+            RequestFactory().get('/'))
+        self.assertIn('rel="next"', response['Link'])
+        self.assertNotIn('rel="prev"', response['Link'])
+        self.assertIn(response['X-Next-Cursor'], response['Link'])
+        self.assertFalse(response.has_header('X-Total-Count'))
+
+    def test_not_paginated(self):
+        response = self.get_response('', RequestFactory().get('/'))
+        self.assertFalse(response.has_header('Link'))
+
+
+@unittest.skipIf(drf is None, 'Django REST Framework is not installed')
+class RestFrameworkPagination(UsersTestCase):
+
+    def setUp(self):
+        self.queryset = User.objects.order_by('username')
+
+    def paginate(self, pagination, **data):
+        request = Request(RequestFactory().get('/users/', data))
+        objects = pagination.paginate_queryset(self.queryset, request)
+        return pagination.get_paginated_response(
+            [user.username for user in objects]).data
+
+    def test_page_number(self):
+        pagination = drf.PageNumberPagination()
+        data = self.paginate(pagination, page=2)
+        self.assertEqual(data['count'], 25)
+        self.assertEqual(data['next'], 'http://testserver/users/?page=3')
+        self.assertEqual(data['previous'], 'http://testserver/users/')
+        self.assertEqual(data['results'][0], 'user10')
+
+    def test_countless(self):
+        pagination = drf.PageNumberPagination()
+        pagination.count = False
+        with self.assertNumQueries(1):
+            data = self.paginate(pagination, page=3)
+        self.assertNotIn('count', data)
+        self.assertIsNone(data['next'])
+        self.assertEqual(len(data['results']), 5)
+
+    def test_keyset(self):
+        data = self.paginate(drf.KeysetPagination())
+        self.assertEqual(data['results'][0], 'user00')
+        self.assertIsNone(data['previous'])
+        cursor = data['next'].split('page=')[1]
+        data = self.paginate(drf.KeysetPagination(), page=cursor)
+        self.assertEqual(data['results'][0], 'user10')
+        self.assertIsNotNone(data['previous'])
+
+
+class SettingsSnapshot(TestCase):
+
+    def tearDown(self):
+        settings.deactivate()
+
+    def test_override_settings(self):
+        self.assertEqual(settings.PER_PAGE, 10)
+        with self.settings(SIMPLE_PAGINATION_PER_PAGE=5):
+            self.assertEqual(settings.PER_PAGE, 5)
+        self.assertEqual(settings.PER_PAGE, 10)
+        with self.assertRaises(AttributeError):
+            settings.get_settings().PER_PAGE = 5
+
+    @override_settings(SIMPLE_PAGINATION_TENANTS={'shop': {'PER_PAGE': 24}})
+    def test_tenants(self):
+        t = Template("{% load paginate %}{% paginate entities %}{% show_pageitems %}")
+        request = RequestFactory().get('/')
+        settings.activate('shop')
+        val = t.render(Context({'entities': range(100), 'request': request}))
+        self.assertEqual(val, 'Showing 1 to 24 of 100 items')
+        settings.deactivate()
+        val = t.render(Context({'entities': range(100), 'request': request}))
+        self.assertEqual(val, 'Showing 1 to 10 of 100 items')
+        with self.assertRaises(LookupError):
+            settings.activate('unknown')
+
+    @override_settings(SIMPLE_PAGINATION_TENANTS={'shop': {'PER_PAGE': 24}})
+    def test_override(self):
+        with settings.override('shop'):
+            self.assertEqual(settings.PER_PAGE, 24)
+            with self.assertRaises(ValueError):
+                with settings.override(None):
+                    self.assertEqual(settings.PER_PAGE, 10)
+                    raise ValueError
+            self.assertEqual(settings.PER_PAGE, 24)
+        self.assertEqual(settings.PER_PAGE, 10)
+
+    @override_settings(SIMPLE_PAGINATION_TENANTS={'shop': {'PER_PAGE': 24}})
+    def test_override_tasks(self):
+        async def get_per_page(tenant):
+            with settings.override(tenant):
+                await asyncio.sleep(0)
+                return settings.PER_PAGE
+
+        async def main():
+            return await asyncio.gather(
+                get_per_page('shop'), get_per_page(None))
+
+        self.assertEqual(asyncio.run(main()), [24, 10])
+
+    @override_settings(
+        ALLOWED_HOSTS=['shop', 'blog'],
+        SIMPLE_PAGINATION_TENANTS={'shop': {'PER_PAGE': 24}})
+    def test_tenant_middleware(self):
+        def view(request):
+            if request.GET.get('fail'):
+                raise ValueError
+            return HttpResponse(str(settings.PER_PAGE))
+
+        middleware = TenantMiddleware(view)
+        factory = RequestFactory()
+        response = middleware(factory.get('/', HTTP_HOST='shop:8000'))
+        self.assertEqual(response.content, b'24')
+        response = middleware(factory.get('/', HTTP_HOST='blog'))
+        self.assertEqual(response.content, b'10')
+        with self.assertRaises(ValueError):
+            middleware(factory.get('/', {'fail': 1}, HTTP_HOST='shop'))
+        self.assertEqual(settings.PER_PAGE, 10)
+
+
+class PageLabels(TestCase):
+
+    def test_default_templates(self):
+        request = RequestFactory().get('/?q=<a>')
+        for number in (1, 2):
+            epage = EndlessPage(request, number, 1, 10, 'page')
+            template_name = 'simple/current_link.html' if number == 1 else (
+                'simple/page_link.html')
+            context = {
+                'add_nofollow': False,
+                'page': epage,
+                'querystring_key': 'page',
+            }
+            self.assertEqual(
+                str(epage),
+                Template("{% include '" + template_name + "' %}").render(
+                    Context(context)))
+
+    @override_settings(
+        SIMPLE_PAGINATION_LOCALIZE_PAGE_NUMBERS=True,
+        USE_THOUSAND_SEPARATOR=True, LANGUAGE_CODE='en')
+    def test_localize_page_numbers(self):
+        request = RequestFactory().get('/')
+        epage = EndlessPage(request, 12345, 1, 20000, 'page')
+        self.assertEqual(epage.label, '12,345')
+        self.assertIn('>12,345<', str(epage))
+
+
+class PathCache(TestCase):
+
+    def setUp(self):
+        path_cache_clear()
+
+    def test_path_cache(self):
+        for i in range(2):
+            request = RequestFactory().get('/entries/', {'q': 'a b'})
+            epage = EndlessPage(request, 3, 1, 10, 'page')
+            self.assertEqual(epage.path, '/entries/?q=a+b&page=3')
+        info = path_cache_info()
+        self.assertEqual((info.hits, info.misses, info.currsize), (1, 1, 1))
+        with self.settings(SIMPLE_PAGINATION_PATH_CACHE_SIZE=2):
+            for number in range(4, 8):
+                EndlessPage(request, number, 1, 10, 'page')
+            self.assertEqual(path_cache_info().currsize, 2)
+        with self.settings(SIMPLE_PAGINATION_PATH_CACHE_MEMORY=0):
+            EndlessPage(request, 8, 1, 10, 'page')
+            self.assertEqual(path_cache_info().currsize, 2)
+
+
+class PagesInPath(TestCase):
+
+    def setUp(self):
+        template = Template(
+            "{% load paginate %}{% paginate 10 entities %}"
+            "{{ entities|join:',' }} {% show_pages %}")
+
+        def view(request):
+            return HttpResponse(template.render(Context({
+                'entities': range(30), 'request': request})))
+        self.urlconf = types.ModuleType('urls')
+        self.urlconf.urlpatterns = page_path('articles/', view, name='articles')
+
+    def get(self, path, data=None):
+        request = RequestFactory().get(path, data)
+        match = resolve(request.path_info, urlconf=self.urlconf)
+        return match.func(request, *match.args, **match.kwargs).content.decode()
+
+    def test_pages_in_path(self):
+        val = self.get('/articles/page/2/', {'q': 'x'})
+        self.assertIn('10,11,12', val)
+        self.assertIn('href="/articles/?q=x"', val)
+        self.assertIn('href="/articles/page/3/?q=x"', val)
+        self.assertNotIn('page=', val)
+        val = self.get('/articles/')
+        self.assertIn('0,1,2', val)
+        self.assertIn('href="/articles/page/2/"', val)
+
+    def test_converter_name(self):
+        converters = get_converters()
+        self.assertIs(converters[PAGE_CONVERTER].__class__, PageConverter)
+        self.assertNotIn('page', converters)
+
+
+def record_context_processor(request):
+    StreamPage.context_processor_calls += 1
+    return {'calls': StreamPage.context_processor_calls}
+
+
+@override_settings(TEMPLATES=[{
+    'BACKEND': 'django.template.backends.django.DjangoTemplates',
+    'OPTIONS': {'loaders': [('django.template.loaders.locmem.Loader', {
+        'header.html': '{{ show_pageitems }}|',
+        'rows.html': '{% for user in object_list %}{{ user.username }} '
+                     '{% endfor %}|',
+        'footer.html': '{{ endless.page.number }}',
+        'calls.html': '{{ calls }}|',
+    }), 'django.template.loaders.app_directories.Loader'],
+        'context_processors': [
+            'simple_pagination.tests.record_context_processor']},
+}])
+class StreamPage(UsersTestCase):
+
+    context_processor_calls = 0
+
+    def test_stream_page(self):
+        request = RequestFactory().get('/', {'page': 2})
+        response = stream_page(
+            request, User.objects.order_by('username'), 'rows.html',
+            per_page=10, chunk_size=4, header_template='header.html',
+            footer_template='footer.html')
+        val = b''.join(response.streaming_content).decode()
+        self.assertEqual(val, '|'.join([
+            'Showing 11 to 20 of 25 items',
+            'user10 user11 user12 user13 ',
+            'user14 user15 user16 user17 ',
+            'user18 user19 ',
+            '2',
+        ]))
+
+    def test_context_processors(self):
+        StreamPage.context_processor_calls = 0
+        response = stream_page(
+            RequestFactory().get('/'), User.objects.order_by('username'),
+            'calls.html', per_page=10, chunk_size=4)
+        val = b''.join(response.streaming_content).decode()
+        self.assertEqual(val, '1|1|1|')
+        self.assertEqual(StreamPage.context_processor_calls, 1)
+
+
+class WindowCountPagination(UsersTestCase):
+
+    def render(self, **data):
+        t = Template(
+            "{% load paginate %}{% window_paginate 10 users %}"
+            "{% for user in users %}{{ user.username }} {% endfor %}"
+            "{% show_pageitems %}")
+        return t.render(Context({
+            'users': User.objects.order_by('username'),
+            'request': RequestFactory().get('/', data),
+        }))
+
+    def test_window_paginate(self):
+        with self.assertNumQueries(1):
+            val = self.render(page=3)
+        self.assertEqual(
+            val, 'user20 user21 user22 user23 user24 '
+                 'Showing 21 to 25 of 25 items')
+        val = self.render(page=9)
+        self.assertTrue(val.startswith('user00 user01'))
+        self.assertTrue(val.endswith('Showing 1 to 10 of 25 items'))
+        self.assertNotIn('simple_pagination_count', val)
+        paginator = WindowCountPaginator(User.objects.order_by('pk'), 10)
+        user = paginator.page(1)[0]
+        self.assertEqual(paginator.count, 25)
+        self.assertFalse(hasattr(user, paginator.count_alias))
+
+    def test_negative_default_number(self):
+        t = Template(
+            "{% load paginate %}"
+            "{% window_paginate 10 users starting from page -1 %}"
+            "{{ users.0.username }} {% show_pages %}")
+        c = Context({
+            'users': User.objects.order_by('username'),
+            'request': RequestFactory().get('/', {'page': 2}),
+        })
+        with self.assertNumQueries(1):
+            val = t.render(c)
+        self.assertTrue(val.startswith('user10'))
+        self.assertIn('href="/?page=1"', val)
+        self.assertIn('href="/"', val)
+        val = t.render(Context({
+            'users': User.objects.order_by('username'),
+            'request': RequestFactory().get('/'),
+        }))
+        self.assertTrue(val.startswith('user20'))
+
+
+class PaginateArguments(TestCase):
+
+    def test_parse(self):
+        arguments = parse_paginate_arguments(
+            "paginate 3,10 entries fields 'id, title' starting from page -1 "
+            "using 'entries_page' with \"/entries/\" as page_entries")
+        self.assertEqual(arguments, {
+            'first_page': '3',
+            'per_page': '10',
+            'objects': 'entries',
+            'containing': None,
+            'fields': "'id, title'",
+            'number': '-1',
+            'key': "'entries_page'",
+            'override_path': '"/entries/"',
+            'var_name': 'page_entries',
+        })
+        self.assertEqual(
+            parse_paginate_arguments('paginate entries using key')['key'],
+            'key')
+        # Objects can be named like the clause keywords.
+        arguments = parse_paginate_arguments('paginate 20 fields')
+        self.assertEqual(
+            (arguments['per_page'], arguments['objects']), ('20', 'fields'))
+        arguments = parse_paginate_arguments('paginate entries using')
+        self.assertEqual(
+            (arguments['per_page'], arguments['objects']), ('entries', 'using'))
+        for contents in (
+                'paginate', 'paginate entries using key extra',
+                'paginate 1,2,3 entries',
+                'paginate 10, entries', 'paginate ,10 entries',
+                'paginate entries starting from page -x',
+                'paginate entries.all', 'paginate entries as x y'):
+            with self.assertRaises(TemplateSyntaxError):
+                parse_paginate_arguments(contents)
+
+    def test_nodes(self):
+        t = Template(
+            "{% load paginate %}{% paginate 2 entries as a %}"
+            "{% paginate 2 entries as a %}")
+        first, second = [
+            node for node in t.nodelist if hasattr(node, 'objects')]
+        self.assertIsNot(first, second)
@@ -1,9 +1,18 @@
 from __future__ import unicode_literals
+import collections
+import sys
+import threading
 import urllib
 
-from simple_pagination.settings import (
-    PAGE_LABEL
-)
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import EmptyPage, Paginator
+from django.db import connections
+from django.db.models.query import QuerySet
+from django.utils.encoding import iri_to_uri
+
+from simple_pagination import cursor
+from simple_pagination import paginators
+from simple_pagination import settings
 
 
 def get_data_from_context(context):
@@ -17,18 +26,201 @@ def get_data_from_context(context):
         raise Exception('Cannot find endless data in context.')
 
 
+def get_data_from_request(request):
+    """Return the list of the pagination data computed for *request*.
+
+    The data of every pagination performed while handling the request is
+    collected, in order, e.g. to be used by the *PaginationLinkMiddleware*.
+    """
+    return request.__dict__.get('_simple_pagination_data', [])
+
+
+def _store_data(request, data):
+    request.__dict__.setdefault('_simple_pagination_data', []).append(data)
+    return data
+
+
 def get_page_number_from_request(
-        request, querystring_key=PAGE_LABEL, default=1):
+        request, querystring_key=None, default=1):
     """Retrieve the current page number from *GET* or *POST* data.
     If the page does not exists in *request*, or is not a number,
-    then *default* number is returned.
+    then *default* number is returned. Views routed by
+    *simple_pagination.paths.page_path* read the page number from the path.
     """
+    if querystring_key is None:
+        querystring_key = settings.PAGE_LABEL
+    paths = request.__dict__.get('_simple_pagination_paths', {})
+    if querystring_key in paths:
+        number = paths[querystring_key][1]
+        return default if number is None else number
     try:
         return int(request.GET[querystring_key])
     except (KeyError, TypeError, ValueError):
         return default
 
 
+def get_cursor_from_request(request, querystring_key=None, default=None):
+    """Retrieve the current cursor position from *GET* data.
+    Return the tuple of ordering values stored in the signed cursor token.
+    If the cursor does not exists in *request*, or is not valid,
+    then *default* is returned.
+    """
+    if querystring_key is None:
+        querystring_key = settings.PAGE_LABEL
+    try:
+        return cursor.decode_cursor(request.GET[querystring_key])
+    except (KeyError, cursor.InvalidCursor):
+        return default
+
+
+def get_per_page_from_request(request, querystring_key=None, default=None):
+    """Retrieve the number of items per page from *GET* data.
+    The value must be in ``settings.PER_PAGE_ALLOWED`` (if not empty), and is
+    limited to ``settings.PER_PAGE_MAX`` (if set). If none of these settings
+    is defined, if the number is not in *request*, or is not valid,
+    then *default* is returned.
+    """
+    conf = settings.get_settings()
+    if not (conf.PER_PAGE_ALLOWED or conf.PER_PAGE_MAX):
+        return default
+    if querystring_key is None:
+        querystring_key = conf.PER_PAGE_LABEL
+    try:
+        per_page = int(request.GET[querystring_key])
+    except (KeyError, TypeError, ValueError):
+        return default
+    if per_page < 1:
+        return default
+    if conf.PER_PAGE_ALLOWED and per_page not in conf.PER_PAGE_ALLOWED:
+        return default
+    if conf.PER_PAGE_MAX:
+        per_page = min(per_page, conf.PER_PAGE_MAX)
+    return per_page
+
+
+def paginate_objects(request, objects, per_page, **kwargs):
+    """Paginate *objects* and return the pagination data for *request*.
+
+    The returned dict is the one stored by the *paginate* template tag in
+    the ``endless`` context key: it contains the current *page*, the
+    *querystring_key*, the *default_number*, the *override_path* and the
+    *per_page* value actually used. A known *count* of *objects* can be
+    passed to avoid querying it, and *fields* can be used to only select
+    some fields of the objects. If *containing* is given, the default page
+    is the one containing that object.
+    If the requested page does not exist, the first page is returned.
+    """
+    paginator_class = kwargs.get('paginator_class', None)
+    if paginator_class is None:
+        paginator_class = paginators.get_paginator_class(objects)
+    default_number = kwargs.get('default_number', 1)
+    conf = settings.get_settings()
+    querystring_key = kwargs.get('querystring_key', None) or conf.PAGE_LABEL
+    override_path = kwargs.get('override_path', None)
+    count = kwargs.get('count', None)
+    fields = kwargs.get('fields', None)
+    containing = kwargs.get('containing', None)
+    querystring_params = {}
+
+    # Clients can choose the number of items per page, within the limits
+    # defined in settings. Links carry the normalized value.
+    requested = get_per_page_from_request(request)
+    if requested is not None:
+        per_page = querystring_params[conf.PER_PAGE_LABEL] = requested
+
+    # The page containing an object depends on the negotiated page size.
+    # Keyset pages are identified by cursors, not by numbers.
+    if containing is not None:
+        if issubclass(paginator_class, paginators.KeysetPaginator):
+            raise ValueError(
+                'Keyset pagination cannot start from the page containing '
+                'an object.')
+        default_number = paginators.get_page_number_for_object(
+            objects, containing, per_page)
+
+    # Only select the given *fields*: named tuples are cheaper than model
+    # instances, but some paginators need the instances.
+    if fields and isinstance(objects, QuerySet):
+        if paginator_class is Paginator:
+            objects = objects.values_list(*fields, named=True)
+        else:
+            objects = objects.only(*fields)
+
+    paginator = paginator_class(objects, per_page)
+    if count is not None:
+        # The count has already been retrieved, e.g. by *paginate_group*.
+        paginator.count = count
+
+    # Keyset pages are identified by cursors. Pages cannot be counted from
+    # the end: a negative default number means the last page, retrieved by
+    # reversing the ordering.
+    if isinstance(paginator, paginators.KeysetPaginator):
+        position = get_cursor_from_request(request, querystring_key)
+        if position is None and default_number < 0:
+            position = (paginators.LAST,)
+        try:
+            page = paginator.page(position)
+        except EmptyPage:
+            page = paginator.page()
+        return _store_data(request, {
+            'default_number': (
+                paginator.last_cursor if default_number < 0 else 1),
+            'override_path': override_path,
+            'page': page,
+            'per_page': per_page,
+            'querystring_key': querystring_key,
+            'querystring_params': querystring_params,
+        })
+
+    # Snapshot links must carry the snapshot token.
+    if isinstance(paginator, paginators.SnapshotPaginator):
+        token = request.GET.get(conf.SNAPSHOT_LABEL)
+        if paginator.load_snapshot(token) or paginator.create_snapshot():
+            querystring_params[conf.SNAPSHOT_LABEL] = paginator.token
+
+    # The current request is used to get the requested page number. A
+    # negative default page number is normalized, which requires the count,
+    # only if no page is requested.
+    page_number = get_page_number_from_request(
+        request, querystring_key, default=None)
+    if page_number is None:
+        if default_number < 0:
+            default_number = normalize_page_number(
+                default_number, paginator.page_range)
+        page_number = default_number
+
+    # Get the page.
+    try:
+        page = paginator.page(page_number)
+    except EmptyPage:
+        page = paginator.page(1)
+
+    # Page links still need the normalized default page number: by now the
+    # objects are usually counted (e.g. to validate the page number).
+    if default_number < 0:
+        default_number = normalize_page_number(
+            default_number, paginator.page_range)
+
+    return _store_data(request, {
+        'default_number': default_number,
+        'override_path': override_path,
+        'page': page,
+        'per_page': per_page,
+        'querystring_key': querystring_key,
+        'querystring_params': querystring_params,
+    })
+
+
+def split_fields(fields):
+    """Return a list of field names from *fields*.
+
+    *fields* can be a comma separated string or a sequence of names.
+    """
+    if isinstance(fields, str):
+        fields = fields.split(',')
+    return [field.strip() for field in fields if field.strip()]
+
+
 def get_page_numbers(current_page, num_pages):
     """Default callable for page listing.
     Produce a Digg-style pagination.
@@ -58,20 +250,241 @@ def get_page_numbers(current_page, num_pages):
 
 
 def get_querystring_for_page(
-        request, page_number, querystring_key, default_number=1):
-    """Return a querystring pointing to *page_number*."""
-    querydict = request.GET.copy()
-    querydict[querystring_key] = page_number
+        request, page_number, querystring_key, default_number=1, params=None):
+    """Return a querystring pointing to *page_number*.
+
+    The optional *params* mapping is added to (or replaces) the request
+    querystring parameters.
+    """
+    querystring = get_querystring_base(request, querystring_key, params)
     # For the default page number (usually 1) the querystring is not required.
-    if page_number == default_number:
-        del querydict[querystring_key]
-    if 'querystring_key' in querydict:
-        del querydict['querystring_key']
-    if querydict:
-        return '?' + urllib.parse.urlencode(querydict)
+    if page_number != default_number:
+        page = urllib.parse.urlencode({querystring_key: page_number})
+        querystring = querystring + '&' + page if querystring else page
+    if querystring:
+        return '?' + querystring
     return ''
 
 
+def get_querystring_base(request, querystring_key, params=None):
+    """Return the urlencoded querystring of *request* without the page key.
+
+    The optional *params* mapping is added to (or replaces) the request
+    querystring parameters. The result does not start with "?" and is empty
+    if no other parameters are present. It is computed once per request and
+    querystring key, so that several paginations in the same page share the
+    parsing work.
+    """
+    cache = request.__dict__.get('_simple_pagination_querystrings')
+    if cache is None or cache[0] is not request.GET:
+        cache = (request.GET, {})
+        request._simple_pagination_querystrings = cache
+    querystrings = cache[1]
+    cache_key = querystring_key
+    if params:
+        cache_key = (querystring_key,) + tuple(sorted(params.items()))
+    try:
+        return querystrings[cache_key]
+    except KeyError:
+        pass
+    querydict = request.GET.copy()
+    for key in (querystring_key, 'querystring_key'):
+        if key in querydict:
+            del querydict[key]
+    if params:
+        querydict.update(params)
+    querystrings[cache_key] = urllib.parse.urlencode(querydict, doseq=True)
+    return querystrings[cache_key]
+
+
+PathCacheInfo = collections.namedtuple(
+    'PathCacheInfo', 'hits misses maxsize currsize memory')
+
+
+class _PathCache(object):
+    """A thread-safe LRU cache of page paths, shared by all requests.
+
+    The number of entries is limited by ``settings.PATH_CACHE_SIZE`` and
+    their (approximate) size in bytes by ``settings.PATH_CACHE_MEMORY``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.memory = 0
+
+    def info(self):
+        with self._lock:
+            return PathCacheInfo(
+                self.hits, self.misses, settings.PATH_CACHE_SIZE,
+                len(self._entries), self.memory)
+
+    def get(self, key, compute):
+        """Return the value cached for *key*, computing it if missing."""
+        with self._lock:
+            try:
+                value, size = self._entries[key]
+            except KeyError:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+        value = compute()
+        conf = settings.get_settings()
+        maxsize = conf.PATH_CACHE_SIZE
+        max_memory = conf.PATH_CACHE_MEMORY
+        size = sum(sys.getsizeof(item) for item in key + value)
+        if maxsize <= 0 or size > max_memory:
+            return value
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = value, size
+                self.memory += size
+                while (len(self._entries) > maxsize or
+                       self.memory > max_memory):
+                    self.memory -= self._entries.popitem(last=False)[1][1]
+        return value
+
+
+_path_cache = _PathCache()
+
+
+def get_path_prefix(request, querystring_key):
+    """Return the path preceding the page number segment in page links.
+
+    Return None if *request* was not routed by
+    *simple_pagination.paths.page_path* for *querystring_key*, i.e. if the
+    page number is in the querystring.
+    """
+    paths = request.__dict__.get('_simple_pagination_paths', {})
+    if querystring_key in paths:
+        return paths[querystring_key][0]
+    return None
+
+
+def get_page_path(request, page_number, querystring_key, **kwargs):
+    """Return the *(url, path)* of the link to *page_number*.
+
+    The *url* is the querystring (see *get_querystring_for_page*) and the
+    *path* is the full link, including *override_path* (by default the
+    request path). Keyword arguments are *default_number*, *params* and
+    *override_path*. Links are cached across requests: use
+    *path_cache_info* to monitor the cache.
+
+    If the page number is in the path (see *get_path_prefix*), the *url*
+    is the full link too.
+    """
+    default_number = kwargs.get('default_number', 1)
+    params = kwargs.get('params', None)
+    override_path = kwargs.get('override_path', None)
+    path = override_path or request.path
+    base = get_querystring_base(request, querystring_key, params)
+    prefix = None if override_path else get_path_prefix(
+        request, querystring_key)
+    if prefix is not None:
+        key = (prefix, base, page_number, querystring_key, default_number, '/')
+
+        def compute():
+            url = iri_to_uri(prefix)
+            if page_number != default_number:
+                url += '{0}/{1}/'.format(
+                    urllib.parse.quote(querystring_key), page_number)
+            if base:
+                url += '?' + base
+            return url, url
+        return _path_cache.get(key, compute)
+    key = (path, base, page_number, querystring_key, default_number)
+
+    def compute():
+        url = get_querystring_for_page(
+            request, page_number, querystring_key,
+            default_number=default_number, params=params)
+        return url, iri_to_uri(path) + url
+    return _path_cache.get(key, compute)
+
+
+def path_cache_info():
+    """Return the hits, misses, maxsize, currsize and memory of the cache.
+
+    The values are those of the cache used by *get_page_path*, as a named
+    tuple similar to the one returned by ``functools.lru_cache``.
+    """
+    return _path_cache.info()
+
+
+def path_cache_clear():
+    """Clear the cache used by *get_page_path* and its statistics."""
+    _path_cache.clear()
+
+
+def get_counts(querysets):
+    """Return the number of objects of each queryset in *querysets*.
+
+    When all the querysets live in the same database, the counts are
+    retrieved in a single round trip, combining them with UNION ALL.
+    Sliced querysets cannot be combined: they are counted separately.
+    """
+    counts = [None] * len(querysets)
+    indexes = [
+        index for index, queryset in enumerate(querysets)
+        if not queryset.query.is_sliced]
+    aliases = set(querysets[index].db for index in indexes)
+    if len(indexes) > 1 and len(aliases) == 1:
+        connection = connections[aliases.pop()]
+        if connection.vendor in ('mysql', 'postgresql', 'sqlite'):
+            try:
+                union = _get_counts_union(
+                    connection, [querysets[index] for index in indexes])
+            except EmptyResultSet:
+                pass
+            else:
+                for index, count in zip(indexes, union):
+                    counts[index] = count
+    return [
+        queryset.count() if count is None else count
+        for queryset, count in zip(querysets, counts)]
+
+
+def is_same_query(queryset, other):
+    """Return True if the querysets *queryset* and *other* are equivalent.
+
+    The querysets are compared by their database, model, SQL and params,
+    e.g. to reuse a count retrieved for an equivalent queryset.
+    """
+    if not isinstance(queryset, QuerySet) or not isinstance(other, QuerySet):
+        return False
+    if queryset.db != other.db or queryset.model is not other.model:
+        return False
+    try:
+        return (
+            queryset.query.sql_with_params() == other.query.sql_with_params())
+    except EmptyResultSet:
+        return False
+
+
+def _get_counts_union(connection, querysets):
+    selects, params = [], []
+    for index, queryset in enumerate(querysets):
+        queryset = queryset.order_by()
+        if not queryset.query.distinct and not queryset.query.combinator:
+            queryset = queryset.values('pk')
+        sql, query_params = queryset.query.get_compiler(
+            connection=connection).as_sql()
+        selects.append(
+            'SELECT %d, COUNT(*) FROM (%s) subquery' % (index, sql))
+        params.extend(query_params)
+    with connection.cursor() as cursor:
+        cursor.execute(' UNION ALL '.join(selects), params)
+        counts = dict(cursor.fetchall())
+    return [counts[index] for index in range(len(querysets))]
+
+
 def normalize_page_number(page_number, page_range):
     """Handle a negative *page_number*.
     Return a positive page number contained in *page_range*.
@@ -13,7 +13,12 @@ if __name__ == "__main__":
                 'ENGINE': 'django.db.backends.sqlite3',
             }
         },
-        INSTALLED_APPS=('simple_pagination',),
+        SECRET_KEY='simple-pagination-tests',
+        INSTALLED_APPS=(
+            'django.contrib.auth',
+            'django.contrib.contenttypes',
+            'simple_pagination',
+        ),
         TEMPLATES=[
             {
                 'BACKEND': 'django.template.backends.django.DjangoTemplates',